@@ -0,0 +1,165 @@
+import redis
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import conexiones
+
+# --- CONFIGURACIÓN DE LA CACHÉ (redis-stack de redis/docker-compose.yml) ---
+# Host y puerto en conexiones.py; timeouts cortos para caer rápido a la consulta directa
+TIMEOUTS_REDIS = {'socket_connect_timeout': 0.5, 'socket_timeout': 0.5}
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))   # Segundos que vive un resultado en caché
+REINTENTO_CAIDA = 30                              # Segundos sin intentar Redis tras un fallo
+
+PREFIJO = "cache:consulta:"
+CLAVE_VERSION = "cache:version:{tabla}"
+CLAVE_METRICAS = "cache:metricas"
+
+# Caché de lectura (read-through) para las consultas analíticas.
+# La clave es un hash de: fuente + consulta normalizada + parámetros + versión de cada tabla
+# leída. Quien escribe en una tabla llama a invalidar(tabla): la versión sube, las claves
+# antiguas dejan de usarse y caducan solas por TTL (no hay que buscarlas ni borrarlas).
+# Si Redis no responde, se consulta directamente la base de datos.
+
+_cliente = None
+_caida_hasta = 0.0
+_lock = threading.Lock()
+_metricas_locales = {"aciertos": 0, "fallos": 0, "sin_cache": 0}
+
+
+def _redis():
+    """ Cliente compartido; None mientras Redis esté marcado como caído. """
+    global _cliente
+    if time.monotonic() < _caida_hasta:
+        return None
+    with _lock:
+        if _cliente is None:
+            _cliente = conexiones.get_redis(**TIMEOUTS_REDIS)
+    return _cliente
+
+
+def _marcar_caida(err):
+    global _caida_hasta
+    _caida_hasta = time.monotonic() + REINTENTO_CAIDA
+    print(f"  [caché] Redis no disponible ({err}); consultas directas durante {REINTENTO_CAIDA}s.")
+
+
+def _contar(metrica, r=None):
+    with _lock:
+        _metricas_locales[metrica] += 1
+    if r is not None:
+        try:
+            r.hincrby(CLAVE_METRICAS, metrica, 1)
+        except redis.RedisError:
+            pass
+
+
+def _serializar(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    raise TypeError(f"Objeto de tipo {type(obj)} no es serializable por JSON")
+
+
+def normalizar(query):
+    """ Misma consulta con distinto sangrado o saltos de línea -> misma clave. """
+    return " ".join(query.split())
+
+
+def clave_cache(fuente, query, params, versiones):
+    contenido = json.dumps([fuente, normalizar(query), list(params or ()), versiones],
+                           default=_serializar, sort_keys=True)
+    return PREFIJO + hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def consultar(fuente, query, params, tablas, cargar, ttl=CACHE_TTL):
+    """
+    Devuelve el resultado de 'query' desde Redis o, si no está, llama a cargar(), lo guarda
+    con TTL y lo devuelve. Si cargar() devuelve None (error), no se guarda nada.
+    Los resultados vuelven de la caché como JSON: Decimal -> float y fechas -> texto ISO.
+    """
+    r = _redis()
+    if r is None:
+        _contar("sin_cache")
+        return cargar()
+
+    try:
+        versiones = r.mget([CLAVE_VERSION.format(tabla=t) for t in tablas])
+        clave = clave_cache(fuente, query, params, dict(zip(tablas, versiones)))
+        guardado = r.get(clave)
+    except redis.RedisError as err:
+        _marcar_caida(err)
+        _contar("sin_cache")
+        return cargar()
+
+    if guardado is not None:
+        _contar("aciertos", r)
+        print(f"  [caché] {fuente}: resultado servido desde Redis.")
+        return json.loads(guardado)
+
+    _contar("fallos", r)
+    datos = cargar()
+    if datos is not None:
+        try:
+            r.set(clave, json.dumps(datos, default=_serializar), ex=ttl)
+        except redis.RedisError as err:
+            _marcar_caida(err)
+    return datos
+
+
+def invalidar(*tablas):
+    """ Sube la versión de las tablas escritas; los resultados que las leían quedan obsoletos. """
+    r = _redis()
+    if r is None or not tablas:
+        return False
+    try:
+        pipe = r.pipeline(transaction=False)
+        for tabla in tablas:
+            pipe.incr(CLAVE_VERSION.format(tabla=tabla))
+        pipe.execute()
+        print(f"  [caché] Versión incrementada: {', '.join(tablas)}.")
+        return True
+    except redis.RedisError as err:
+        _marcar_caida(err)
+        return False
+
+
+def metricas():
+    """ Aciertos/fallos de este proceso y acumulados en Redis (todas las ejecuciones). """
+    resultado = {"proceso": dict(_metricas_locales)}
+    r = _redis()
+    if r is not None:
+        try:
+            globales = {k: int(v) for k, v in r.hgetall(CLAVE_METRICAS).items()}
+            consultas = globales.get("aciertos", 0) + globales.get("fallos", 0)
+            globales["tasa_aciertos"] = round(globales.get("aciertos", 0) / consultas, 3) if consultas else None
+            resultado["redis"] = globales
+        except redis.RedisError as err:
+            _marcar_caida(err)
+    return resultado
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Métricas e invalidación de la caché de consultas en Redis.")
+    parser.add_argument('--invalidar', nargs='+', metavar='TABLA', default=[],
+                        help="Incrementar la versión de estas tablas.")
+    parser.add_argument('--reiniciar-metricas', action='store_true',
+                        help="Poner a cero los contadores de aciertos/fallos.")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.invalidar:
+        invalidar(*args.invalidar)
+    if args.reiniciar_metricas and _redis() is not None:
+        _redis().delete(CLAVE_METRICAS)
+    print(json.dumps(metricas(), indent=4, ensure_ascii=False))
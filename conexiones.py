@@ -0,0 +1,198 @@
+import mysql.connector
+import mysql.connector.pooling
+import psycopg2
+import psycopg2.pool
+import redis
+from pymongo import MongoClient
+import json
+import os
+import threading
+import time
+
+# --- CONFIGURACIÓN CENTRALIZADA DE CONEXIONES ---
+# Un único sitio para credenciales y tamaños de pool de todos los scripts de la raíz.
+# Cada script pide conexiones con la base de datos que necesita y, si acaso, algún ajuste
+# propio (timeouts); las conexiones se reutilizan en lugar de pagar TCP + autenticación
+# en cada operación.
+MYSQL_CONFIG = {
+    'user': os.getenv("MYSQL_USER", "root"),
+    'password': os.getenv("MYSQL_PASSWORD", "0853"),
+    'host': os.getenv("MYSQL_HOST", "127.0.0.1"),
+    'port': int(os.getenv("MYSQL_PORT", "3306")),
+}
+POSTGRES_CONFIG = {
+    'user': os.getenv("POSTGRES_USER", "postgres"),
+    'password': os.getenv("POSTGRES_PASSWORD", "mi_clave"),
+    'host': os.getenv("POSTGRES_HOST", "127.0.0.1"),
+    'port': int(os.getenv("POSTGRES_PORT", "5433")),
+}
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://127.0.0.1:27017/")
+REDIS_CONFIG = {
+    'host': os.getenv("REDIS_HOST", "127.0.0.1"),
+    'port': int(os.getenv("REDIS_PORT", "6379")),
+}
+
+POOL_SIZE = int(os.getenv("POOL_SIZE", "5"))          # Conexiones por pool (máximo 32 en MySQL)
+POOL_TIMEOUT = float(os.getenv("POOL_TIMEOUT", "10"))  # Segundos esperando una conexión libre
+
+_lock = threading.Lock()
+_mysql_pools = {}
+_postgres_pools = {}
+_postgres_owner = {}    # id(conexión) -> pool del que salió
+_redis_pools = {}
+_mongo_clients = {}
+
+
+def _pool_key(database, config):
+    return database, tuple(sorted(config.items()))
+
+
+def _wait_for(get, error, timeout):
+    """ Los pools no esperan si están agotados: reintentamos hasta el timeout. """
+    limit = time.monotonic() + timeout
+    while True:
+        try:
+            return get()
+        except error:
+            if time.monotonic() >= limit:
+                raise
+            time.sleep(0.01)
+
+# ----------------------------------------------------------------------
+# MySQL: un MySQLConnectionPool por base de datos (y ajustes)
+# ----------------------------------------------------------------------
+def _mysql_pool(database=None, pool_size=POOL_SIZE, **config):
+    key = _pool_key(database, config)
+    with _lock:
+        if key not in _mysql_pools:
+            params = {**MYSQL_CONFIG, **config}
+            if database:
+                params['database'] = database
+            # El pool abre sus pool_size conexiones al crearse (no crece bajo demanda)
+            _mysql_pools[key] = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name=f"pool{len(_mysql_pools)}_{database or 'servidor'}"[:64],
+                pool_size=pool_size, pool_reset_session=True, **params)
+        return _mysql_pools[key]
+
+
+def get_mysql_connection(database=None, timeout=POOL_TIMEOUT, pool_size=POOL_SIZE, **config):
+    """
+    Conexión del pool de 'database'; conn.close() la devuelve al pool. pool_size solo
+    cuenta al crear el pool: los scripts que usan una conexión cada vez piden pool_size=1.
+    """
+    pool = _mysql_pool(database, pool_size, **config)
+    return _wait_for(pool.get_connection, mysql.connector.errors.PoolError, timeout)
+
+# ----------------------------------------------------------------------
+# PostgreSQL: ThreadedConnectionPool (seguro entre hilos)
+# ----------------------------------------------------------------------
+def _postgres_pool(database, **config):
+    key = _pool_key(database, config)
+    with _lock:
+        if key not in _postgres_pools:
+            _postgres_pools[key] = psycopg2.pool.ThreadedConnectionPool(
+                1, POOL_SIZE, **{**POSTGRES_CONFIG, **config}, database=database)
+        return _postgres_pools[key]
+
+
+def get_postgres_connection(database, timeout=POOL_TIMEOUT, **config):
+    """ Conexión del pool; hay que devolverla con release_postgres_connection(). """
+    pool = _postgres_pool(database, **config)
+    conn = _wait_for(pool.getconn, psycopg2.pool.PoolError, timeout)
+    _postgres_owner[id(conn)] = pool
+    return conn
+
+
+def release_postgres_connection(conn):
+    """ Devuelve la conexión a su pool (deshaciendo lo que quedara sin confirmar). """
+    pool = _postgres_owner.pop(id(conn), None)
+    if pool is None:
+        conn.close()
+        return
+    if not conn.closed and not conn.autocommit:
+        conn.rollback()
+    pool.putconn(conn, close=bool(conn.closed))
+
+# ----------------------------------------------------------------------
+# Redis (ConnectionPool compartido) y MongoDB (un MongoClient por URI, ya trae su pool)
+# ----------------------------------------------------------------------
+def get_redis(**config):
+    """ Cliente Redis (decode_responses=True) sobre un ConnectionPool por ajustes (timeouts...). """
+    key = tuple(sorted(config.items()))
+    with _lock:
+        if key not in _redis_pools:
+            _redis_pools[key] = redis.ConnectionPool(**{**REDIS_CONFIG, **config},
+                                                     max_connections=POOL_SIZE * 4,
+                                                     decode_responses=True)
+        return redis.Redis(connection_pool=_redis_pools[key])
+
+
+def get_mongo_client(uri=MONGO_URI, **options):
+    """ MongoClient único por URI y opciones: es seguro entre hilos y no debe cerrarse tras cada uso. """
+    key = (uri, tuple(sorted(options.items())))
+    with _lock:
+        if key not in _mongo_clients:
+            _mongo_clients[key] = MongoClient(uri, maxPoolSize=POOL_SIZE * 4, **options)
+        return _mongo_clients[key]
+
+# ----------------------------------------------------------------------
+# Salud y métricas
+# ----------------------------------------------------------------------
+def _timed(check):
+    start = time.perf_counter()
+    try:
+        check()
+        return {"estado": "ok", "ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        return {"estado": "error", "error": str(e)}
+
+
+def _check_mysql(database):
+    conn = get_mysql_connection(database)
+    try:
+        conn.ping(reconnect=False)
+    finally:
+        conn.close()
+
+
+def _check_postgres(database):
+    conn = get_postgres_connection(database)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    finally:
+        release_postgres_connection(conn)
+
+
+def health_check(mysql_db=None, postgres_db="postgres", backends=("MySQL", "PostgreSQL", "Redis", "MongoDB")):
+    """ Comprueba cada backend con una operación mínima y mide la latencia. """
+    checks = {
+        "MySQL": lambda: _check_mysql(mysql_db),
+        "PostgreSQL": lambda: _check_postgres(postgres_db),
+        "Redis": lambda: get_redis().ping(),
+        "MongoDB": lambda: get_mongo_client(serverSelectionTimeoutMS=2000).admin.command('ping'),
+    }
+    return {name: _timed(checks[name]) for name in backends}
+
+
+def pool_metrics():
+    """ Tamaño y uso de cada pool creado en este proceso. """
+    metrics = {"MySQL": {}, "PostgreSQL": {}, "Redis": {}, "MongoDB": len(_mongo_clients)}
+    for (database, _), pool in _mysql_pools.items():
+        idle = pool._cnx_queue.qsize()
+        metrics["MySQL"][database or "servidor"] = {"tamano": pool.pool_size, "libres": idle,
+                                                    "en_uso": pool.pool_size - idle}
+    for (database, _), pool in _postgres_pools.items():
+        metrics["PostgreSQL"][database] = {"tamano": pool.maxconn, "libres": len(pool._pool),
+                                           "en_uso": len(pool._used)}
+    for key, pool in _redis_pools.items():
+        metrics["Redis"][", ".join(f"{k}={v}" for k, v in key) or "defecto"] = {
+            "tamano": pool.max_connections,
+            "libres": len(pool._available_connections),
+            "en_uso": len(pool._in_use_connections)}
+    return metrics
+
+
+if __name__ == '__main__':
+    print(json.dumps({"salud": health_check(), "pools": pool_metrics()}, indent=4, ensure_ascii=False))
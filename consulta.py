@@ -1,37 +1,25 @@
-
 import mysql.connector
+import argparse
 import json
+import os
+import shutil
+import textwrap
 from datetime import datetime
 from decimal import Decimal
 
+import cache_consultas
+import conexiones
+
 # --- CONFIGURACIÓN DE CONEXIÓN ---
+# Credenciales y pool de conexiones en conexiones.py
 DB_NAME = "CENTROCUIDADOFAMILIAR"
-DB_CONFIG = {
-    'user': 'root',
-    'password': 'mi_clave',      
-    'host': '127.0.0.1',
-    'port': 3306,               
-    'database': DB_NAME
-}
 
 OUTPUT_FILE = "datos_analisis.json"
+STREAM_BATCH_SIZE = 1000
+DESCRIPCION = "Análisis discriminante que cruza variables socioeconómicas (Género, Renta) con la Calidad del Servicio (Puntuación) y el Costo (Precio/Subvención)."
 
-def get_data_for_analysis():
-    """ Obtiene datos combinados de USUARIA, SERVICIO y RESENA. """
-    print("-> Conectando a MySQL y obteniendo datos para análisis de discriminación...")
-    conn = None
-    
-    # Esta consulta cruza las variables demograficas sensibles con la calidad del servicio (Puntuación)
-    QUERY = """
-    SELECT
-        U.IDUsuario,
-        U.Barrio,
-        U.RentaPercapita,
-        U.Genero,
-        S.PrecioFinal,
-        S.SubvencionAplicada,
-        R.Puntuacion,
-        D.TipoDependencia
+# Servicios completados y reseñados: base común del análisis crudo y del informe agregado
+ANALYSIS_JOIN = """
     FROM
         USUARIA U
     JOIN
@@ -43,10 +31,59 @@ def get_data_for_analysis():
     WHERE
         S.Estado = 'Completado' AND R.Puntuacion IS NOT NULL
     """
+
+# Esta consulta cruza las variables demograficas sensibles con la calidad del servicio (Puntuación)
+ANALYSIS_QUERY = """
+    SELECT
+        U.IDUsuario,
+        U.Barrio,
+        U.RentaPercapita,
+        U.Genero,
+        S.PrecioFinal,
+        S.SubvencionAplicada,
+        R.Puntuacion,
+        D.TipoDependencia
+    """ + ANALYSIS_JOIN
+
+# Informe agregado en el servidor: la fila con EsTotal = 1 es el total de WITH ROLLUP
+GENDER_REPORT_QUERY = """
+    SELECT Genero, GROUPING(Genero) AS EsTotal, AVG(Puntuacion) AS Media, COUNT(*) AS Registros
+    FROM (
+        SELECT COALESCE(U.Genero, 'No especificado') AS Genero, R.Puntuacion
+        """ + ANALYSIS_JOIN + """
+    ) T
+    GROUP BY Genero WITH ROLLUP
+    """
+
+INCOME_REPORT_QUERY = """
+    SELECT GrupoRenta, GROUPING(GrupoRenta) AS EsTotal, AVG(Puntuacion) AS Media, COUNT(*) AS Registros
+    FROM (
+        SELECT
+            CASE
+                WHEN U.RentaPercapita < 20000 THEN 'Baja'
+                WHEN U.RentaPercapita <= 40000 THEN 'Media'
+                ELSE 'Alta'
+            END AS GrupoRenta,
+            R.Puntuacion
+        """ + ANALYSIS_JOIN + """
+        AND U.RentaPercapita IS NOT NULL
+    ) T
+    GROUP BY GrupoRenta WITH ROLLUP
+    """
+
+INCOME_GROUPS = ['Baja', 'Media', 'Alta']
+
+# Tablas que leen las consultas del informe (versiones que invalidan su caché)
+REPORT_TABLES = ('USUARIA', 'SERVICIO', 'DEPENDIENTE', 'RESENA')
+
+def get_data_for_analysis():
+    """ Obtiene datos combinados de USUARIA, SERVICIO y RESENA. """
+    print("-> Conectando a MySQL y obteniendo datos para análisis de discriminación...")
+    conn = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = conexiones.get_mysql_connection(DB_NAME, pool_size=1)
         cursor = conn.cursor(dictionary=True)
-        cursor.execute(QUERY)
+        cursor.execute(ANALYSIS_QUERY)
         data = cursor.fetchall()
         print(f"  Se obtuvieron {len(data)} registros de servicios completados y reseñados.")
         return data
@@ -60,6 +97,150 @@ def get_data_for_analysis():
             cursor.close()
             conn.close()
 
+def stream_data_for_analysis(batch_size=STREAM_BATCH_SIZE):
+    """
+    Igual que get_data_for_analysis pero en streaming: cursor sin buffer y fetchmany,
+    así nunca hay más de batch_size filas en memoria.
+    """
+    print("-> Conectando a MySQL (modo streaming) para análisis de discriminación...")
+    conn = None
+    cursor = None
+    try:
+        conn = conexiones.get_mysql_connection(DB_NAME, pool_size=1)
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        cursor.execute(ANALYSIS_QUERY)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    except mysql.connector.Error as err:
+        # Se propaga: quien escribe el JSON debe saber que los datos están incompletos
+        print(f"  MySQL ERROR: {err.msg}")
+        raise
+
+    finally:
+        if conn and conn.is_connected():
+            if cursor:
+                # Un cursor sin buffer debe consumirse entero antes de cerrar la conexión
+                conn.consume_results()
+                cursor.close()
+            conn.close()
+
+
+def get_report_indicators(use_cache=True):
+    """
+    Indicadores del informe a través de la caché de Redis (cache_consultas.py): mientras
+    no cambie ninguna de REPORT_TABLES, los refrescos no vuelven a tocar MySQL.
+    """
+    if not use_cache:
+        return _query_report_indicators()
+
+    def load():
+        indicators, registros = _query_report_indicators()
+        return None if indicators is None else {"indicadores": indicators, "registros": registros}
+
+    cached = cache_consultas.consultar("MySQL", GENDER_REPORT_QUERY + INCOME_REPORT_QUERY, (),
+                                       REPORT_TABLES, load)
+    if cached is None:
+        return None, 0
+    return cached["indicadores"], cached["registros"]
+
+
+def _query_report_indicators():
+    """
+    Calcula los indicadores con GROUP BY ... WITH ROLLUP en MySQL: solo viajan
+    unas pocas filas por la red, sea cual sea el tamaño del histórico.
+    """
+    print("-> Conectando a MySQL y calculando indicadores en el servidor (GROUP BY)...")
+    conn = None
+    try:
+        conn = conexiones.get_mysql_connection(DB_NAME, pool_size=1)
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute(GENDER_REPORT_QUERY)
+        gender_rows = cursor.fetchall()
+        cursor.execute(INCOME_REPORT_QUERY)
+        income_rows = {row['GrupoRenta']: row for row in cursor.fetchall() if not row['EsTotal']}
+
+        total = next((row for row in gender_rows if row['EsTotal']), None)
+        indicators = {
+            "puntuacion_promedio_por_genero": {
+                row['Genero']: round(float(row['Media']), 2) for row in gender_rows if not row['EsTotal']
+            },
+            "puntuacion_promedio_por_grupo_renta": {
+                grupo: round(float(income_rows[grupo]['Media']), 2) for grupo in INCOME_GROUPS if grupo in income_rows
+            },
+            "puntuacion_promedio_total": round(float(total['Media']), 2) if total else None,
+        }
+        registros = total['Registros'] if total else 0
+        print(f"  Indicadores calculados sobre {registros} registros de servicios completados y reseñados.")
+        return indicators, registros
+
+    except mysql.connector.Error as err:
+        print(f"  MySQL ERROR: {err.msg}")
+        return None, 0
+
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+def income_group(renta):
+    """ Grupos de Renta (Baja: < 20k, Media: 20k-40k, Alta: > 40k). """
+    if renta < 20000:
+        return 'Baja'
+    elif renta <= 40000:
+        return 'Media'
+    return 'Alta'
+
+
+def row_to_json(row):
+    """ Copia de la fila con los Decimal convertidos a float (para JSON). """
+    processed_row = dict(row)
+    for key in ['RentaPercapita', 'PrecioFinal', 'SubvencionAplicada']:
+        if processed_row.get(key) is not None:
+            processed_row[key] = float(processed_row[key])
+    return processed_row
+
+
+class ScoreAggregator:
+    """ Medias de Puntuación por género y por grupo de renta con sumas y conteos acumulados. """
+
+    def __init__(self):
+        self.rows = 0
+        self.gender = {}
+        self.income = {'Baja': [0, 0], 'Media': [0, 0], 'Alta': [0, 0]}
+
+    def add(self, row):
+        self.rows += 1
+        score = row.get('Puntuacion')
+        if score is None:
+            return
+
+        gender = row.get('Genero') or 'No especificado'
+        acc = self.gender.setdefault(gender, [0, 0])
+        acc[0] += score
+        acc[1] += 1
+
+        renta = row.get('RentaPercapita')
+        if renta is not None:
+            acc = self.income[income_group(renta)]
+            acc[0] += score
+            acc[1] += 1
+
+    @staticmethod
+    def _averages(sums):
+        return {key: round(total / count, 2) for key, (total, count) in sums.items() if count}
+
+    def avg_by_gender(self):
+        return self._averages(self.gender)
+
+    def avg_by_income_group(self):
+        return self._averages(self.income)
+
 
 def generate_analysis_json(raw_data):
     """ Procesa los datos y genera un archivo JSON con análisis y datos discriminantes. """
@@ -67,68 +248,22 @@ def generate_analysis_json(raw_data):
         print("  No se pudo generar el JSON por falta de datos.")
         return
 
-    # --- 1. PRE-PROCESAMIENTO Y AGREGACIÓN ---
+    # --- 1. PRE-PROCESAMIENTO Y AGREGACIÓN (una sola pasada) ---
     processed_data = []
-    
-    # Diccionarios para análisis: {Clave: [Puntuaciones], ...}
-    gender_scores_map = {} 
-    
-    for row in raw_data:
-        processed_row = dict(row) 
-        
-        # Conversión de tipos para JSON (Decimal a float)
-        for key in ['RentaPercapita', 'PrecioFinal', 'SubvencionAplicada']:
-            if processed_row.get(key) is not None:
-                 # Usa float() para convertir Decimal a flotante (para JSON)
-                processed_row[key] = float(processed_row[key]) 
-
-        processed_data.append(processed_row)
+    aggregator = ScoreAggregator()
 
-        # Agregación por GÉNERO
-        gender = row.get('Genero') or 'No especificado'
-        score = row.get('Puntuacion')
-        
-        if score is not None:
-            if gender not in gender_scores_map:
-                gender_scores_map[gender] = []
-            gender_scores_map[gender].append(score)
-
-
-    # --- 2. ANÁLISIS AGREGADO (INDICADORES CLAVE) ---
-    
-    # Puntuación Promedio por Género
-    avg_scores_gender = {
-        gender: round(sum(scores) / len(scores), 2)
-        for gender, scores in gender_scores_map.items() if scores
-    }
-    
-    # Creación de Grupos de Renta (Baja: < 20k, Media: 20k-40k, Alta: > 40k)
-    renta_scores_map = {'Baja': [], 'Media': [], 'Alta': []}
     for row in raw_data:
-        renta = row.get('RentaPercapita')
-        score = row.get('Puntuacion')
+        processed_data.append(row_to_json(row))
+        aggregator.add(row)
 
-        if renta is not None and score is not None:
-            if renta < 20000:
-                renta_scores_map['Baja'].append(score)
-            elif renta <= 40000:
-                renta_scores_map['Media'].append(score)
-            else:
-                renta_scores_map['Alta'].append(score)
-
-    avg_scores_renta = {
-        grupo: round(sum(scores) / len(scores), 2)
-        for grupo, scores in renta_scores_map.items() if scores
-    }
+    # --- 2. ANÁLISIS AGREGADO (INDICADORES CLAVE) ---
+    avg_scores_gender = aggregator.avg_by_gender()
+    avg_scores_renta = aggregator.avg_by_income_group()
 
 
     # --- 3. GENERACIÓN DEL JSON FINAL ---
     final_json = {
-        "metadata": {
-            "fecha_generacion": datetime.now().isoformat(),
-            "descripcion": "Análisis discriminante que cruza variables socioeconómicas (Género, Renta) con la Calidad del Servicio (Puntuación) y el Costo (Precio/Subvención).",
-            "registros_analizados_con_resena": len(processed_data)
-        },
+        "metadata": _analysis_metadata(len(processed_data)),
         "indicadores_clave_discriminacion": {
             "puntuacion_promedio_por_genero": avg_scores_gender,
             "puntuacion_promedio_por_grupo_renta": avg_scores_renta,
@@ -145,6 +280,116 @@ def generate_analysis_json(raw_data):
         print(f" ERROR al guardar el JSON: {e}")
 
 
+def _analysis_metadata(registros):
+    return {
+        "fecha_generacion": datetime.now().isoformat(),
+        "descripcion": DESCRIPCION,
+        "registros_analizados_con_resena": registros
+    }
+
+
+def generate_analysis_json_stream(rows, indicators=None):
+    """
+    Versión en streaming de generate_analysis_json: agrega en una sola pasada y escribe
+    'datos_discriminantes_crudos' fila a fila en un archivo auxiliar. Al final, cuando ya se
+    conocen, se escriben metadata e indicadores y detrás se copian las filas: mismo orden de
+    claves que generate_analysis_json y la memoria no depende del número de filas.
+    Si se pasan indicators (calculados en SQL) se usan tal cual en vez de agregar en Python.
+    """
+    aggregator = ScoreAggregator()
+    # Se escribe en un temporal que solo sustituye a OUTPUT_FILE si todo ha ido bien
+    temp_file = OUTPUT_FILE + '.tmp'
+    raw_file = OUTPUT_FILE + '.crudos.tmp'
+    try:
+        with open(raw_file, 'w+', encoding='utf-8') as raw:
+            for row in rows:
+                raw.write(',\n' if aggregator.rows else '\n')
+                raw.write(textwrap.indent(json.dumps(row_to_json(row), ensure_ascii=False, indent=4), ' ' * 8))
+                aggregator.add(row)
+
+            if not aggregator.rows and indicators is None:
+                print("  No se pudo generar el JSON por falta de datos.")
+                return
+
+            head = {
+                "metadata": _analysis_metadata(aggregator.rows),
+                "indicadores_clave_discriminacion": indicators or {
+                    "puntuacion_promedio_por_genero": aggregator.avg_by_gender(),
+                    "puntuacion_promedio_por_grupo_renta": aggregator.avg_by_income_group(),
+                },
+            }
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                # Se omite la llave de cierre: detrás van las filas crudas
+                f.write(json.dumps(head, ensure_ascii=False, indent=4)[:-2])
+                f.write(',\n    "datos_discriminantes_crudos": [')
+                raw.seek(0)
+                shutil.copyfileobj(raw, f)
+                f.write('\n    ]\n}' if aggregator.rows else ']\n}')
+    except mysql.connector.Error:
+        _discard(temp_file)
+        print("  No se pudo generar el JSON por falta de datos.")
+        return
+    except Exception as e:
+        _discard(temp_file)
+        print(f" ERROR al guardar el JSON: {e}")
+        return
+    finally:
+        _discard(raw_file)
+
+    os.replace(temp_file, OUTPUT_FILE)
+    print(f"  Se procesaron {aggregator.rows} registros de servicios completados y reseñados.")
+    print(f"\n Archivo JSON de análisis generado con éxito: {OUTPUT_FILE}")
+
+
+def _discard(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def generate_report_json(include_raw=False, batch_size=STREAM_BATCH_SIZE, use_cache=True):
+    """ Informe con indicadores calculados en SQL; las filas crudas solo si se piden. """
+    indicators, registros = get_report_indicators(use_cache)
+    if indicators is None:
+        print("  No se pudo generar el JSON por falta de datos.")
+        return
+
+    if include_raw:
+        generate_analysis_json_stream(stream_data_for_analysis(batch_size), indicators)
+        return
+
+    final_json = {
+        "metadata": _analysis_metadata(registros),
+        "indicadores_clave_discriminacion": indicators
+    }
+    try:
+        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+            json.dump(final_json, f, ensure_ascii=False, indent=4)
+        print(f"\n Archivo JSON de análisis generado con éxito: {OUTPUT_FILE}")
+    except Exception as e:
+        print(f" ERROR al guardar el JSON: {e}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera datos_analisis.json desde MySQL.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Cursor sin buffer y escritura incremental: memoria constante.")
+    parser.add_argument('--informe', action='store_true',
+                        help="Indicadores calculados en MySQL con GROUP BY ... WITH ROLLUP.")
+    parser.add_argument('--crudos', action='store_true',
+                        help="Con --informe, incluir también las filas crudas (en streaming).")
+    parser.add_argument('--sin-cache', action='store_true',
+                        help="Con --informe, consultar MySQL sin pasar por la caché de Redis.")
+    parser.add_argument('--batch-size', type=int, default=STREAM_BATCH_SIZE,
+                        help="Filas por fetchmany en modo --stream / --crudos.")
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
-    data = get_data_for_analysis()
-    generate_analysis_json(data)
\ No newline at end of file
+    args = parse_args()
+    if args.informe:
+        generate_report_json(args.crudos, args.batch_size, not args.sin_cache)
+    elif args.stream:
+        generate_analysis_json_stream(stream_data_for_analysis(args.batch_size))
+    else:
+        data = get_data_for_analysis()
+        generate_analysis_json(data)
\ No newline at end of file
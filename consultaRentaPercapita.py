@@ -0,0 +1,333 @@
+import mysql.connector
+import psycopg2
+import psycopg2.extras
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from decimal import Decimal
+
+import cache_consultas
+import conexiones
+
+# --- CONFIGURACIÓN DE CONEXIÓN  ---
+# Credenciales, pools y cliente de MongoDB compartidos en conexiones.py
+DB_NAME = "centrocuidadofamiliar"
+
+# Tiempo máximo (segundos) que se espera a cada fuente. También se pasa a los drivers
+# como timeout de conexión/lectura para que un backend caído no deje hilos colgados.
+SOURCE_TIMEOUTS = {'MySQL': 10, 'PostgreSQL': 10, 'MongoDB': 10}
+
+# Una sola consulta parametrizada por backend; el rango cubre todas las bandas pedidas
+USUARIA_QUERY = """
+    SELECT
+        IDUsuario, Nombre, Apellido, Genero, Barrio, RentaPercapita, Email
+    FROM
+        USUARIA
+    """
+
+# ----------------------------------------------------------------------
+# 0. Bandas de renta
+# ----------------------------------------------------------------------
+# Una banda es (mínimo exclusivo, máximo inclusivo, archivo de salida); None = sin límite.
+
+def threshold_band(threshold, output_file=None):
+    """ Banda 'renta > threshold' (el criterio de los antiguos scripts 15k/30k). """
+    return {'min': threshold, 'max': None,
+            'output': output_file or f"usuarias_renta_{_label(threshold)}.json"}
+
+def range_band(minimum, maximum, output_file=None):
+    """ Banda 'minimum < renta <= maximum'. """
+    return {'min': minimum, 'max': maximum,
+            'output': output_file or f"usuarias_renta_{_label(minimum or 0)}_{_label(maximum)}.json"}
+
+# Por defecto se generan los dos informes históricos en una sola pasada por base de datos
+DEFAULT_BANDS = [
+    threshold_band(15000.00, "usuarias_renta_15k.json"),
+    threshold_band(30000.00, "usuarias_renta_alta.json"),
+]
+
+def _label(value):
+    if value is None:
+        return "inf"
+    return f"{value / 1000:g}k"
+
+def band_criteria(band):
+    if band['max'] is None:
+        return f"Renta Percapita Superior a {band['min']} €"
+    if band['min'] is None:
+        return f"Renta Percapita Hasta {band['max']} €"
+    return f"Renta Percapita Superior a {band['min']} € y Hasta {band['max']} €"
+
+def covering_range(bands):
+    """ Rango (min, max) más pequeño que contiene a todas las bandas: una sola consulta por fuente. """
+    lower = None if any(b['min'] is None for b in bands) else min(b['min'] for b in bands)
+    upper = None if any(b['max'] is None for b in bands) else max(b['max'] for b in bands)
+    return lower, upper
+
+def in_band(band, renta):
+    if renta is None:
+        return False
+    return (band['min'] is None or renta > band['min']) and (band['max'] is None or renta <= band['max'])
+
+def _renta(row):
+    # PostgreSQL devuelve los nombres de columna en minúsculas
+    return row.get('RentaPercapita', row.get('rentapercapita'))
+
+def _sql_range(lower, upper):
+    """ Cláusula WHERE con marcadores %s y sus parámetros (nada se interpola en el SQL). """
+    conditions, params = [], []
+    if lower is not None:
+        conditions.append("RentaPercapita > %s")
+        params.append(lower)
+    if upper is not None:
+        conditions.append("RentaPercapita <= %s")
+        params.append(upper)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return USUARIA_QUERY + where, tuple(params)
+
+# Función para convertir tipos de datos que JSON no entiende
+def default_converter(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (Decimal, float)):
+        return float(obj)
+    if isinstance(obj, set):
+        return list(obj)
+    raise TypeError(f"Objeto de tipo {type(obj)} no es serializable por JSON")
+
+# ----------------------------------------------------------------------
+# 1. Extracción de MySQL
+# ----------------------------------------------------------------------
+def get_mysql_data(lower, upper):
+    print(f"-> Extrayendo usuarias con renta en ({lower}, {upper}] de MySQL...")
+    conn = None
+    query, params = _sql_range(lower, upper)
+    try:
+        conn = conexiones.get_mysql_connection(DB_NAME, connection_timeout=SOURCE_TIMEOUTS['MySQL'], pool_size=1)
+        # Sentencia preparada en el servidor (protocolo binario)
+        cursor = conn.cursor(prepared=True)
+        cursor.execute(query, params)
+        columns = cursor.column_names
+        data = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        print(f" MySQL: Encontradas {len(data)} usuarias.")
+        return data
+
+    except mysql.connector.Error as err:
+        print(f" MySQL ERROR: {err.msg}")
+        return None
+
+    finally:
+        if conn and conn.is_connected():
+            conn.close()
+
+# ----------------------------------------------------------------------
+# 2. Extracción de PostgreSQL
+# ----------------------------------------------------------------------
+def get_postgres_data(lower, upper):
+    print(f"-> Extrayendo usuarias con renta en ({lower}, {upper}] de PostgreSQL...")
+    conn = None
+    query, params = _sql_range(lower, upper)
+    try:
+        timeout = SOURCE_TIMEOUTS['PostgreSQL']
+        conn = conexiones.get_postgres_connection(DB_NAME, connect_timeout=timeout,
+                                                  options=f"-c statement_timeout={timeout * 1000}")
+        cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cursor.execute(query, params)
+        # Convertir a lista de diccionarios estándar
+        data = [dict(row) for row in cursor.fetchall()]
+        print(f"  PostgreSQL: Encontradas {len(data)} usuarias.")
+        return data
+
+    except psycopg2.Error as err:
+        print(f" PostgreSQL ERROR: {err}")
+        return None
+
+    finally:
+        if conn:
+            conexiones.release_postgres_connection(conn)
+
+# ----------------------------------------------------------------------
+# 3. Extracción de MongoDB
+# ----------------------------------------------------------------------
+def get_mongodb_data(lower, upper):
+    print(f"-> Extrayendo usuarias con renta en ({lower}, {upper}] de MongoDB...")
+    data = []
+    renta_filter = {}
+    if lower is not None:
+        renta_filter["$gt"] = lower
+    if upper is not None:
+        renta_filter["$lte"] = upper
+    try:
+        timeout_ms = SOURCE_TIMEOUTS['MongoDB'] * 1000
+        client = conexiones.get_mongo_client(serverSelectionTimeoutMS=timeout_ms,
+                                             connectTimeoutMS=timeout_ms, socketTimeoutMS=timeout_ms)
+        db = client[DB_NAME]
+
+        cursor = db['usuarios_mongo'].find(
+            {"DatosSensibles.RentaPercapita": renta_filter} if renta_filter else {},
+        # Proyección (campos a devolver, similar al SELECT)
+        {"IDUsuario": 1, "NombreCompleto": 1, "DatosSensibles.Genero": 1,
+         "DatosSensibles.Barrio": 1, "DatosSensibles.RentaPercapita": 1,
+         "Contacto.email": 1, "_id": 0})
+
+        for doc in cursor:
+            # Reestructurar el documento para que coincida con el formato SQL
+            data.append({
+                'IDUsuario': doc.get('IDUsuario'),
+                'NombreCompleto': doc.get('NombreCompleto'),
+                'Genero': doc.get('DatosSensibles', {}).get('Genero'),
+                'Barrio': doc.get('DatosSensibles', {}).get('Barrio'),
+                'RentaPercapita': doc.get('DatosSensibles', {}).get('RentaPercapita'),
+                'Email': doc.get('Contacto', {}).get('email'),
+                'Fuente': 'MongoDB' # Añadir la fuente para el JSON final
+            })
+
+        print(f" MongoDB: Encontradas {len(data)} usuarias.")
+        return data
+
+    except Exception as e:
+        print(f" MongoDB ERROR: {e}")
+        return None
+
+# ----------------------------------------------------------------------
+# 4. Extracción concurrente de las tres fuentes
+# ----------------------------------------------------------------------
+SOURCES = {
+    'MySQL': get_mysql_data,
+    'PostgreSQL': get_postgres_data,
+    'MongoDB': get_mongodb_data,
+}
+
+# Tabla/colección que lee cada fuente (su versión invalida la caché de Redis)
+SOURCE_TABLES = {
+    'MySQL': ('USUARIA',),
+    'PostgreSQL': ('USUARIA',),
+    'MongoDB': ('usuarios_mongo',),
+}
+
+def cached_fetch(name, lower, upper):
+    """
+    Extracción a través de la caché de Redis (cache_consultas.py). La clave identifica
+    la fuente y el rango con la misma consulta parametrizada que usan los backends SQL.
+    """
+    query, params = _sql_range(lower, upper)
+    return cache_consultas.consultar(name, query, params, SOURCE_TABLES[name],
+                                     lambda: SOURCES[name](lower, upper))
+
+def fetch_sources_concurrently(bands, skip_slow=False, omit=(), use_cache=True):
+    """
+    Lanza una única extracción por fuente (el rango que cubre todas las bandas) y va
+    repartiendo las filas entre las bandas según llegan.
+    Devuelve (filas_por_banda, estado_por_fuente). Con skip_slow=True, una fuente
+    que supera su timeout se marca como 'timeout' y no bloquea la consolidación.
+    """
+    lower, upper = covering_range(bands)
+    band_rows = [[] for _ in bands]
+    status = {name: {"estado": "omitida"} for name in SOURCES if name in omit}
+
+    executor = ThreadPoolExecutor(max_workers=len(SOURCES))
+    start = time.perf_counter()
+    if use_cache:
+        pending = {executor.submit(cached_fetch, name, lower, upper): name for name in SOURCES if name not in omit}
+    else:
+        pending = {executor.submit(fn, lower, upper): name for name, fn in SOURCES.items() if name not in omit}
+    try:
+        while pending:
+            elapsed = time.perf_counter() - start
+            wait_for = None
+            if skip_slow:
+                wait_for = max(0, min(SOURCE_TIMEOUTS[name] for name in pending.values()) - elapsed)
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = pending.pop(future)
+                seconds = round(time.perf_counter() - start, 3)
+                rows = future.result()
+                if rows is None:
+                    status[name] = {"estado": "error", "segundos": seconds}
+                    continue
+                for row in rows:
+                    row['Fuente'] = name
+                    renta = _renta(row)
+                    for band, target in zip(bands, band_rows):
+                        if in_band(band, renta):
+                            target.append(row)
+                status[name] = {"estado": "ok", "registros": len(rows), "segundos": seconds}
+                print(f"  [{name}] {len(rows)} registros recibidos en {seconds}s.")
+
+            if skip_slow:
+                elapsed = time.perf_counter() - start
+                for future, name in list(pending.items()):
+                    if elapsed >= SOURCE_TIMEOUTS[name]:
+                        del pending[future]
+                        status[name] = {"estado": "timeout", "segundos": SOURCE_TIMEOUTS[name]}
+                        print(f"  [{name}] Sin respuesta tras {SOURCE_TIMEOUTS[name]}s: se omite.")
+    finally:
+        # No esperamos a los hilos que sigan bloqueados; los timeouts del driver los cerrarán
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return band_rows, status
+
+# ----------------------------------------------------------------------
+# 5. Consolidación y Generación de JSON (un archivo por banda)
+# ----------------------------------------------------------------------
+def consolidate_and_generate_json(bands=DEFAULT_BANDS, skip_slow=False, omit=(), use_cache=True):
+
+    # 1. Obtener, etiquetar y repartir por banda los datos de las tres fuentes
+    band_rows, status = fetch_sources_concurrently(bands, skip_slow, omit, use_cache)
+
+    for band, consolidated_data in zip(bands, band_rows):
+        # 2. Formato Final
+        final_json = {
+            "metadata": {
+                "fecha_consolidacion": datetime.now().isoformat(),
+                "criterio_filtro": band_criteria(band),
+                "total_registros_consolidados": len(consolidated_data),
+                "fuentes": status
+            },
+            "usuarias_renta_alta": consolidated_data
+        }
+
+        # 3. Guardar en archivo JSON
+        try:
+            with open(band['output'], 'w', encoding='utf-8') as f:
+                # Usar 'default' para manejar tipos como Decimal (MySQL/Postgres)
+                json.dump(final_json, f, default=default_converter, ensure_ascii=False, indent=4)
+            print(f"\n¡Éxito! Archivo JSON consolidado generado: {band['output']}")
+        except Exception as e:
+            print(f"ERROR al guardar el JSON: {e}")
+
+def _parse_band(text):
+    minimum, _, maximum = text.partition(':')
+    return range_band(float(minimum) if minimum else None, float(maximum) if maximum else None)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Consolida usuarias por renta desde MySQL, PostgreSQL y MongoDB.")
+    parser.add_argument('--umbrales', nargs='+', type=float, default=[],
+                        help="Umbrales 'renta > X'; un JSON por umbral (p. ej. 15000 30000).")
+    parser.add_argument('--bandas', nargs='+', type=_parse_band, default=[],
+                        help="Bandas 'min:max' (min exclusivo, max inclusivo; vacío = sin límite).")
+    parser.add_argument('--omitir-lentas', action='store_true',
+                        help="No esperar a las fuentes que superen su timeout (se marcan como 'timeout').")
+    parser.add_argument('--timeout', type=int,
+                        help="Timeout en segundos para todas las fuentes (por defecto SOURCE_TIMEOUTS).")
+    parser.add_argument('--omitir', nargs='*', default=[], choices=list(SOURCES),
+                        help="Fuentes que no se consultan.")
+    parser.add_argument('--sin-cache', action='store_true',
+                        help="Consultar las fuentes sin pasar por la caché de Redis.")
+    return parser.parse_args()
+
+def main(default_bands=DEFAULT_BANDS):
+    global SOURCE_TIMEOUTS
+    args = parse_args()
+    if args.timeout:
+        SOURCE_TIMEOUTS = {name: args.timeout for name in SOURCES}
+    bands = [threshold_band(t) for t in args.umbrales] + args.bandas
+    consolidate_and_generate_json(bands or default_bands, args.omitir_lentas, args.omitir, not args.sin_cache)
+    if not args.sin_cache:
+        print(f"Caché de consultas: {cache_consultas.metricas()}")
+
+if __name__ == '__main__':
+    main()
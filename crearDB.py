@@ -1,28 +1,15 @@
 import mysql.connector
 import psycopg2
 from psycopg2 import sql
-from pymongo import MongoClient
-
-
-DB_NAME = "centrocuidadofamiliar"   # Nombre de la base de datos en minúsculas para PostgreSQL y MongoDB CENTROCUIDADOFAMILIAR
-DB_CONFIG = {
-    'mysql': {
-        'user': 'root',
-        'password': '0853',         # AJUSTAR mi_clave a 0853
-        'host': '127.0.0.1',  #  '127.0.0.1'
-        'port': 3306                                     
-    },
-    #'postgres': {
-    #    'user': 'postgres',
-    #    'password': 'mi_clave',         
-    #    'host': '127.0.0.1',
-    #   'port': 5433                    
-    }
-    #'mongo_uri': "mongodb://127.0.0.1:27017/"
-#}
+import argparse
+import sys
+from datetime import date
 
+import conexiones
 
 
+DB_NAME = "centrocuidadofamiliar"   # Nombre de la base de datos en minúsculas para PostgreSQL y MongoDB CENTROCUIDADOFAMILIAR
+# MySQL, PostgreSQL (--postgres) y MongoDB: credenciales y pools de conexiones en conexiones.py
 
 MYSQL_TABLES_SQL = f"""
 CREATE DATABASE IF NOT EXISTS {DB_NAME};
@@ -187,17 +174,265 @@ CREATE TABLE IF NOT EXISTS RESENA (
 );
 """
 
+# --- TABLAS PARTICIONADAS POR MES (opción --particionado) ---
+# SERVICIO se particiona por FechaHoraInicio y TRANSACCION por FechaTransaccion.
+# Restricciones de MySQL: toda clave única debe incluir la columna de partición y las
+# tablas particionadas no admiten claves foráneas (ni ser referenciadas), así que en esta
+# variante las FK de SERVICIO, TRANSACCION y RESENA->SERVICIO se sustituyen por índices.
+MYSQL_PARTITIONED_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS SERVICIO (
+    IDServicio INT NOT NULL AUTO_INCREMENT,
+    IDUsuario INT NOT NULL,
+    IDDependiente INT NOT NULL,
+    IDCuidador INT,
+    IDCentro INT,
+    FechaHoraInicio DATETIME NOT NULL, 
+    FechaHoraFin DATETIME NOT NULL,
+    PrecioBase DECIMAL(10, 2) NOT NULL,
+    SubvencionAplicada DECIMAL(10, 2) DEFAULT 0.00,
+    PrecioFinal DECIMAL(10, 2) NOT NULL,
+    Estado VARCHAR(50),
+    
+    PRIMARY KEY (IDServicio, FechaHoraInicio),
+    KEY (IDUsuario),
+    KEY (IDDependiente),
+    KEY (IDCuidador),
+    KEY (IDCentro)
+)
+PARTITION BY RANGE COLUMNS (FechaHoraInicio) ({particiones_servicio});
+
+CREATE TABLE IF NOT EXISTS TRANSACCION (
+    IDTransaccion INT NOT NULL AUTO_INCREMENT,
+    IDServicio INT NOT NULL,
+    FechaTransaccion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, 
+    Monto DECIMAL(10, 2) NOT NULL,
+    EstadoPago VARCHAR(50),
+    
+    PRIMARY KEY (IDTransaccion, FechaTransaccion),
+    UNIQUE KEY (IDServicio, FechaTransaccion)
+)
+PARTITION BY RANGE COLUMNS (FechaTransaccion) ({particiones_transaccion});
+
+CREATE TABLE IF NOT EXISTS RESENA (
+    IDResena INT PRIMARY KEY AUTO_INCREMENT,
+    IDServicio INT UNIQUE NOT NULL,
+    IDUsuario INT NOT NULL,
+    Puntuacion INT,
+    Comentario TEXT,
+    FechaResena DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (IDUsuario) REFERENCES USUARIA(IDUsuario)
+);
+"""
+
+# En PostgreSQL las particiones mensuales las crea mantener_particiones(); la partición
+# DEFAULT recoge lo que caiga fuera de las ya creadas. Las tablas que referencian a SERVICIO
+# pierden esa FK: la PK de una tabla particionada debe incluir la clave de partición.
+POSTGRES_PARTITIONED_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS SERVICIO (
+    IDServicio SERIAL,
+    IDUsuario INT NOT NULL REFERENCES USUARIA(IDUsuario),
+    IDDependiente INT NOT NULL REFERENCES DEPENDIENTE(IDDependiente),
+    IDCuidador INT REFERENCES CUIDADOR(IDCuidador),
+    IDCentro INT REFERENCES CENTRO(IDCentro),
+    FechaHoraInicio TIMESTAMP WITHOUT TIME ZONE NOT NULL, 
+    FechaHoraFin TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PrecioBase NUMERIC(10, 2) NOT NULL,
+    SubvencionAplicada NUMERIC(10, 2) DEFAULT 0.00,
+    PrecioFinal NUMERIC(10, 2) NOT NULL,
+    Estado VARCHAR(50) CHECK (Estado IN ('Pendiente', 'Asignado', 'En Curso', 'Completado', 'Cancelado')),
+    PRIMARY KEY (IDServicio, FechaHoraInicio)
+) PARTITION BY RANGE (FechaHoraInicio);
+
+CREATE TABLE IF NOT EXISTS SERVICIO_DEFAULT PARTITION OF SERVICIO DEFAULT;
+
+CREATE TABLE IF NOT EXISTS TRANSACCION (
+    IDTransaccion SERIAL,
+    IDServicio INT NOT NULL,
+    FechaTransaccion TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    Monto NUMERIC(10, 2) NOT NULL,
+    EstadoPago VARCHAR(50) CHECK (EstadoPago IN ('Pendiente', 'Completado', 'Fallido', 'Reembolsado')),
+    PRIMARY KEY (IDTransaccion, FechaTransaccion),
+    UNIQUE (IDServicio, FechaTransaccion)
+) PARTITION BY RANGE (FechaTransaccion);
+
+CREATE TABLE IF NOT EXISTS TRANSACCION_DEFAULT PARTITION OF TRANSACCION DEFAULT;
+
+CREATE TABLE IF NOT EXISTS RESENA (
+    IDResena SERIAL PRIMARY KEY,
+    IDServicio INT UNIQUE NOT NULL,
+    IDUsuario INT NOT NULL REFERENCES USUARIA(IDUsuario),
+    Puntuacion INT CHECK (Puntuacion >= 1 AND Puntuacion <= 5),
+    Comentario TEXT,
+    FechaResena TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Tabla particionada -> columna de partición
+PARTITIONED_TABLES = {'SERVICIO': 'FechaHoraInicio', 'TRANSACCION': 'FechaTransaccion'}
+# Ventana por defecto: el año de histórico que genera Faker y unos meses por delante
+MESES_RETENCION = 12
+MESES_FUTUROS = 3
+
+# --- ÍNDICES SECUNDARIOS ---
+# Diseñados para las consultas reales del proyecto (consulta.py, consultaRentaPercapita*.py
+# y las ventanas de tiempo sobre SERVICIO). InnoDB añade la PK a cada índice secundario,
+# así que IDServicio ya está incluido en los índices de SERVICIO.
+MYSQL_INDEXES = [
+    # (tabla, nombre, columnas)
+    # Filtro Estado + join con USUARIA/DEPENDIENTE; con PrecioFinal y SubvencionAplicada
+    # el índice cubre todo lo que consulta.py lee de SERVICIO (no visita la fila).
+    ('SERVICIO', 'idx_servicio_estado_usuario', 'Estado, IDUsuario, IDDependiente, PrecioFinal, SubvencionAplicada'),
+    ('SERVICIO', 'idx_servicio_inicio', 'FechaHoraInicio'),
+    # LEFT JOIN RESENA + lectura de Puntuacion solo desde el índice
+    ('RESENA', 'idx_resena_servicio_puntuacion', 'IDServicio, Puntuacion'),
+    # Filtro por renta de consultaRentaPercapita*.py
+    ('USUARIA', 'idx_usuaria_renta', 'RentaPercapita'),
+]
+
+# En PostgreSQL las columnas que solo se leen van en INCLUDE (índice cubriente)
+POSTGRES_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_servicio_estado_usuario ON SERVICIO (Estado, IDUsuario) INCLUDE (IDDependiente, PrecioFinal, SubvencionAplicada);
+CREATE INDEX IF NOT EXISTS idx_servicio_inicio ON SERVICIO (FechaHoraInicio);
+CREATE INDEX IF NOT EXISTS idx_resena_servicio_puntuacion ON RESENA (IDServicio) INCLUDE (Puntuacion);
+CREATE INDEX IF NOT EXISTS idx_usuaria_renta ON USUARIA (RentaPercapita);
+"""
+
+# --- PARTICIONES ---
+
+def month_start(base, offset):
+    """ Primer día del mes desplazado offset meses respecto a base. """
+    months = base.year * 12 + base.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+def partition_window(months_back=MESES_RETENCION, months_ahead=MESES_FUTUROS, today=None):
+    """ Meses (primer día) que deben tener partición: desde months_back atrás hasta months_ahead adelante. """
+    today = today or date.today()
+    return [month_start(today, offset) for offset in range(-months_back, months_ahead + 1)]
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+def mysql_partition_definition(month):
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{month_start(month, 1):%Y-%m-%d}')"
+
+def mysql_tables_sql(partitioned=False):
+    """ DDL de MySQL; con partitioned=True, SERVICIO/TRANSACCION/RESENA usan la variante particionada. """
+    if not partitioned:
+        return MYSQL_TABLES_SQL
+    clauses = ",\n    ".join([mysql_partition_definition(m) for m in partition_window()]
+                              + ["PARTITION pmax VALUES LESS THAN (MAXVALUE)"])
+    base = MYSQL_TABLES_SQL.split("CREATE TABLE IF NOT EXISTS SERVICIO")[0]
+    return base + MYSQL_PARTITIONED_TABLES_SQL.format(particiones_servicio=clauses, particiones_transaccion=clauses)
+
+def maintain_mysql_partitions(months_back=MESES_RETENCION, months_ahead=MESES_FUTUROS):
+    """
+    Crea las particiones de los próximos meses (partiendo pmax) y desengancha las que
+    salen de la ventana de retención: se intercambian con una tabla de archivo
+    <TABLA>_pAAAAMM (los datos se conservan fuera de la tabla viva) y se eliminan.
+    """
+    print("-> Manteniendo particiones mensuales en MySQL...")
+    conn = None
+    try:
+        conn = conexiones.get_mysql_connection(DB_NAME, pool_size=1)
+        cursor = conn.cursor()
+        window = partition_window(months_back, months_ahead)
+        oldest = window[0]
+        for table in PARTITIONED_TABLES:
+            cursor.execute(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+                (DB_NAME, table)
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            if not existing:
+                print(f"  MySQL: {table} no está particionada (crea la estructura con --particionado).")
+                continue
+
+            newest = max((name for name in existing if name != 'pmax'), default='')
+            missing = [m for m in window if partition_name(m) not in existing and partition_name(m) > newest]
+            if missing:
+                definitions = ", ".join(mysql_partition_definition(m) for m in missing)
+                cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO "
+                               f"({definitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+                print(f"  MySQL: {table} +{len(missing)} particiones ({partition_name(missing[0])}..{partition_name(missing[-1])}).")
+
+            for name in sorted(existing):
+                if name == 'pmax' or name >= partition_name(oldest):
+                    continue
+                archive = f"{table}_{name}"
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {archive} LIKE {table}")
+                cursor.execute(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+                cursor.execute(f"ALTER TABLE {table} EXCHANGE PARTITION {name} WITH TABLE {archive}")
+                cursor.execute(f"ALTER TABLE {table} DROP PARTITION {name}")
+                print(f"  MySQL: {table}.{name} desenganchada en la tabla {archive}.")
+        conn.commit()
+    except mysql.connector.Error as err:
+        print(f"  MySQL ERROR: {err.msg}")
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+def maintain_postgres_partitions(months_back=MESES_RETENCION, months_ahead=MESES_FUTUROS):
+    """ Igual que la versión MySQL con particionado declarativo: CREATE ... PARTITION OF y DETACH PARTITION. """
+    print("-> Manteniendo particiones mensuales en PostgreSQL...")
+    conn = None
+    try:
+        conn = psycopg2.connect(**conexiones.POSTGRES_CONFIG, database=DB_NAME)
+        conn.autocommit = True
+        cursor = conn.cursor()
+        window = partition_window(months_back, months_ahead)
+        oldest = window[0]
+        for table in PARTITIONED_TABLES:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = %s", (table.lower(),)
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            for month in window:
+                child = f"{table.lower()}_{partition_name(month)}"
+                if child not in existing:
+                    cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                        sql.Identifier(child), sql.Identifier(table.lower())), (month, month_start(month, 1)))
+                    print(f"  PostgreSQL: partición {child} creada.")
+            for child in sorted(existing):
+                suffix = child.rsplit('_', 1)[-1]
+                if suffix.startswith('p') and suffix < partition_name(oldest):
+                    cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                        sql.Identifier(table.lower()), sql.Identifier(child)))
+                    print(f"  PostgreSQL: partición {child} desenganchada (la tabla se conserva).")
+    except psycopg2.Error as err:
+        print(f"  PostgreSQL ERROR: {err}")
+    finally:
+        if conn:
+            conn.close()
+
 # --- FUNCIONES DE CREACIÓN (Mismas que tenías) ---
 
-def create_mysql_structure():
-    print("-> Creando estructura en MySQL...")
+def create_mysql_indexes(cursor):
+    """ MySQL no tiene CREATE INDEX IF NOT EXISTS: se consultan los existentes antes. """
+    cursor.execute(
+        "SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = %s",
+        (DB_NAME,)
+    )
+    existing = {(table.upper(), name) for table, name in cursor.fetchall()}
+    for table, name, columns in MYSQL_INDEXES:
+        if (table, name) not in existing:
+            cursor.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+            print(f"  MySQL: Índice {name} creado en {table}.")
+
+def create_mysql_structure(partitioned=False):
+    print(f"-> Creando estructura en MySQL{' (SERVICIO/TRANSACCION particionadas por mes)' if partitioned else ''}...")
     conn = None
     try:
-        conn = mysql.connector.connect(**DB_CONFIG['mysql'])
+        conn = conexiones.get_mysql_connection(pool_size=1)
         cursor = conn.cursor()
-        for statement in MYSQL_TABLES_SQL.split(';'):
+        for statement in mysql_tables_sql(partitioned).split(';'):
             if statement.strip():
                 cursor.execute(statement)
+        create_mysql_indexes(cursor)
         conn.commit()
         print("  MySQL: Estructura creada con éxito.")
     except mysql.connector.Error as err:
@@ -206,13 +441,12 @@ def create_mysql_structure():
         if conn and conn.is_connected():
             cursor.close()
             conn.close()
-""" 
-def create_postgres_structure():
+def create_postgres_structure(partitioned=False):
     print("-> Creando estructura en PostgreSQL...")
     temp_conn = None
     conn = None
     try:
-        temp_conn = psycopg2.connect(**DB_CONFIG['postgres'], database="postgres")
+        temp_conn = psycopg2.connect(**conexiones.POSTGRES_CONFIG, database="postgres")
         temp_conn.autocommit = True
         cursor = temp_conn.cursor()
         try:
@@ -222,12 +456,17 @@ def create_postgres_structure():
         cursor.close()
         temp_conn.close()
 
-        conn = psycopg2.connect(**DB_CONFIG['postgres'], database=DB_NAME)
+        conn = psycopg2.connect(**conexiones.POSTGRES_CONFIG, database=DB_NAME)
         cursor = conn.cursor()
-        for statement in POSTGRES_TABLES_SQL.split(';'):
+        tables_sql = POSTGRES_TABLES_SQL
+        if partitioned:
+            tables_sql = tables_sql.split("CREATE TABLE IF NOT EXISTS SERVICIO")[0] + POSTGRES_PARTITIONED_TABLES_SQL
+        for statement in (tables_sql + POSTGRES_INDEXES_SQL).split(';'):
             if statement.strip():
                 cursor.execute(statement)
         conn.commit()
+        if partitioned:
+            maintain_postgres_partitions()
         print("  PostgreSQL: Estructura creada con éxito.")
 
     except psycopg2.Error as err:
@@ -240,10 +479,11 @@ def create_postgres_structure():
         if conn:
             conn.close()
 
+""" 
 def create_mongodb_structure():
     print("-> Creando colecciones en MongoDB...")
     try:
-        client = MongoClient(DB_CONFIG['mongo_uri'])
+        client = conexiones.get_mongo_client()
         db = client[DB_NAME]
         
         collections = ['usuarios_mongo', 'dependientes_mongo', 'cuidadores_mongo', 'centros_mongo', 'servicios_mongo', 'transacciones_mongo', 'resenas_mongo', 'logs']
@@ -254,14 +494,94 @@ def create_mongodb_structure():
         db['servicios_mongo'].create_index([("IDUsuario", 1), ("IDCuidador", 1)])
         db['transacciones_mongo'].create_index([("IDServicio", 1)], unique=True)
         
-        client.close()
         print("  MongoDB: Colecciones creadas con éxito.")
         
     except Exception as e:
         print(f" MongoDB ERROR: {e}")
 """
+
+# --- VERIFICACIÓN DE PLANES (EXPLAIN) ---
+
+# Rango de renta de la sonda: ~1% de las usuarias con la renta uniforme 10k-60k de rellenarDB.py
+RENTA_SONDA = (15000.00, 15500.00)
+
+def plan_checks():
+    """ Consultas del proyecto cuyo plan no debe recurrir a un full scan. """
+    import consulta
+    import consultaRentaPercapita
+    checks = [
+        ("consulta.py: análisis discriminante", consulta.ANALYSIS_QUERY, ()),
+        ("consulta.py: informe por género", consulta.GENDER_REPORT_QUERY, ()),
+        ("consulta.py: informe por grupo de renta", consulta.INCOME_REPORT_QUERY, ()),
+    ]
+    # Las bandas por defecto (> 15k, > 30k) abarcan la mayoría de usuarias y ahí el full scan es
+    # la decisión correcta del optimizador: se sondea idx_usuaria_renta con un rango selectivo
+    band = consultaRentaPercapita.range_band(*RENTA_SONDA)
+    query, params = consultaRentaPercapita._sql_range(band['min'], band['max'])
+    checks.append((f"consultaRentaPercapita: {consultaRentaPercapita.band_criteria(band)}", query, params))
+    checks.append(("SERVICIO: ventana del último mes",
+                   "SELECT IDServicio, FechaHoraInicio, PrecioFinal FROM SERVICIO "
+                   "WHERE FechaHoraInicio >= NOW() - INTERVAL 1 MONTH", ()))
+    return checks
+
+def verify_mysql_plans():
+    """
+    Ejecuta EXPLAIN sobre cada consulta y falla si alguna tabla se lee con type = ALL.
+    Ojo: con tablas casi vacías el optimizador puede preferir el full scan aunque exista
+    el índice; la verificación tiene sentido con un volumen de datos realista (rellenarDB.py --bulk).
+    """
+    print("-> Verificando planes de ejecución en MySQL (EXPLAIN)...")
+    conn = None
+    failures = []
+    try:
+        conn = conexiones.get_mysql_connection(DB_NAME, pool_size=1)
+        cursor = conn.cursor(dictionary=True)
+        for name, query, params in plan_checks():
+            cursor.execute("EXPLAIN " + query, params)
+            # Las tablas derivadas (<derivedN>) se leen enteras por definición
+            scans = [row['table'] for row in cursor.fetchall()
+                     if row['type'] == 'ALL' and not str(row['table']).startswith('<')]
+            if scans:
+                failures.append(name)
+                print(f"  ❌ {name}: full scan en {', '.join(scans)}")
+            else:
+                print(f"  ✅ {name}: usa índices")
+    except mysql.connector.Error as err:
+        print(f"  MySQL ERROR: {err.msg}")
+        return False
+    finally:
+        if conn and conn.is_connected():
+            cursor.close()
+            conn.close()
+    return not failures
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crea las estructuras de CENTROCUIDADOFAMILIAR.")
+    parser.add_argument('--verificar-planes', action='store_true',
+                        help="Tras crear la estructura, comprobar con EXPLAIN que ninguna consulta hace full scan.")
+    parser.add_argument('--postgres', action='store_true',
+                        help="Crear también la estructura (tablas e índices) en PostgreSQL (conexiones.POSTGRES_CONFIG).")
+    parser.add_argument('--particionado', action='store_true',
+                        help="Crear SERVICIO y TRANSACCION particionadas por mes (RANGE en MySQL, declarativo en PostgreSQL).")
+    parser.add_argument('--mantener-particiones', action='store_true',
+                        help="Solo mantenimiento: crear particiones futuras y desenganchar las antiguas.")
+    parser.add_argument('--meses-futuros', type=int, default=MESES_FUTUROS,
+                        help="Meses por delante con partición ya creada.")
+    parser.add_argument('--meses-retencion', type=int, default=MESES_RETENCION,
+                        help="Meses de histórico que se mantienen en la tabla viva.")
+    return parser.parse_args()
+
 if __name__ == '__main__':
+    args = parse_args()
+    if args.mantener_particiones:
+        maintain_mysql_partitions(args.meses_retencion, args.meses_futuros)
+        if args.postgres:
+            maintain_postgres_partitions(args.meses_retencion, args.meses_futuros)
+        sys.exit(0)
     print("--- INICIO DE CREACIÓN DE ESTRUCTURAS DE BASES DE DATOS ---")
-    create_mysql_structure()
-    #create_postgres_structure()
-    #create_mongodb_structure()
\ No newline at end of file
+    create_mysql_structure(args.particionado)
+    if args.postgres:
+        create_postgres_structure(args.particionado)
+    #create_mongodb_structure()
+    if args.verificar_planes and not verify_mysql_plans():
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,111 @@
+import pymongo
+import argparse
+import itertools
+import time
+from conexion_atlas import mongo_uri
+# Mismos generadores, índices e informes que main.py
+from esquemas import (ESQUEMAS, ESQUEMA_REFERENCIADO, ESQUEMA_EMBEBIDO, INDICES,
+                      generar_series, generar_produccion, embeber_produccion,
+                      pipeline_top_eeuu, pipeline_coste_total)
+
+# =========================================================
+# Benchmark: esquema referenciado ($lookup) vs embebido
+# =========================================================
+# Carga N series en dos bases de datos de prueba (una por esquema) y mide los dos
+# informes que dependen de la producción: gasto financiero y top finalizadas de EE.UU.
+#   referenciado -> series + detalles_produccion, informes con $lookup por título
+#   embebido     -> series con subdocumento 'produccion' y 'coste_total' precalculado
+# Las bases de datos de prueba se borran al terminar (salvo con --conservar).
+
+MONGO_URI = mongo_uri()
+if MONGO_URI is None:
+    print("❌ Error: MONGO_USER o MONGO_PASS no encontrados en el archivo .env")
+    exit()
+
+# Mismos informes que main.py en cada esquema
+PIPELINES = {esquema: {"coste_total": pipeline_coste_total(esquema), "top_eeuu": pipeline_top_eeuu(esquema)}
+             for esquema in ESQUEMAS}
+
+def cargar(client, num_series, tam_lote):
+    """Inserta los mismos datos en las dos bases de prueba. Devuelve segundos por esquema."""
+    db_ref = client["TV_StreamDB_bench_referenciado"]
+    db_emb = client["TV_StreamDB_bench_embebido"]
+    for db in (db_ref, db_emb):
+        db.drop_collection("series")
+        db.drop_collection("detalles_produccion")
+
+    tiempos = {esquema: 0.0 for esquema in ESQUEMAS}
+    generador = generar_series(num_series)
+    cargadas = 0
+    while True:
+        series = list(itertools.islice(generador, tam_lote))
+        if not series:
+            break
+        produccion = [generar_produccion(serie["titulo"]) for serie in series]
+
+        t0 = time.perf_counter()
+        db_ref.series.insert_many([dict(s) for s in series], ordered=False)
+        # Copias: insert_many añade _id a cada dict y la producción se embebe después
+        db_ref.detalles_produccion.insert_many([dict(p) for p in produccion], ordered=False)
+        tiempos[ESQUEMA_REFERENCIADO] += time.perf_counter() - t0
+
+        embebidas = [embeber_produccion(serie, detalles) for serie, detalles in zip(series, produccion)]
+        t0 = time.perf_counter()
+        db_emb.series.insert_many(embebidas, ordered=False)
+        tiempos[ESQUEMA_EMBEBIDO] += time.perf_counter() - t0
+
+        cargadas += len(series)
+        print(f"  ...{cargadas}/{num_series} series cargadas")
+
+    # Los índices de main.py (INDICES); el esquema embebido no usa detalles_produccion
+    bases = {ESQUEMA_REFERENCIADO: db_ref, ESQUEMA_EMBEBIDO: db_emb}
+    for esquema, db in bases.items():
+        t0 = time.perf_counter()
+        for coleccion, indices in INDICES.items():
+            if esquema == ESQUEMA_EMBEBIDO and coleccion == "detalles_produccion":
+                continue
+            for nombre, claves in indices:
+                db[coleccion].create_index(claves, name=nombre)
+        tiempos[esquema] += time.perf_counter() - t0
+    return bases, tiempos
+
+def medir(db, pipeline, repeticiones):
+    """Mejor tiempo (s) de 'repeticiones' ejecuciones consumiendo el cursor entero."""
+    mejor, filas = None, 0
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        filas = sum(1 for _ in db.series.aggregate(pipeline, allowDiskUse=True))
+        transcurrido = time.perf_counter() - t0
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor, filas
+
+def tamano_mb(db):
+    stats = db.command("dbStats")
+    return round((stats["dataSize"] + stats["indexSize"]) / (1024 * 1024), 1)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compara los informes con esquema referenciado y embebido.")
+    parser.add_argument("--series", type=int, default=1_000_000, help="Número de series a generar.")
+    parser.add_argument("--lote", type=int, default=10_000, help="Documentos por insert_many.")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Ejecuciones por informe (se toma la mejor).")
+    parser.add_argument("--conservar", action="store_true", help="No borrar las bases de datos de prueba.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    client = pymongo.MongoClient(MONGO_URI)
+
+    print(f"Cargando {args.series} series en ambos esquemas (lotes de {args.lote})...")
+    bases, tiempos_carga = cargar(client, args.series, args.lote)
+
+    print(f"\n{'esquema':<14}{'carga (s)':>12}{'tamaño (MB)':>14}{'coste (s)':>12}{'top EE.UU. (s)':>16}{'filas':>10}")
+    for esquema, db in bases.items():
+        t_coste, filas_coste = medir(db, PIPELINES[esquema]["coste_total"], args.repeticiones)
+        t_top, filas_top = medir(db, PIPELINES[esquema]["top_eeuu"], args.repeticiones)
+        print(f"{esquema:<14}{tiempos_carga[esquema]:>12.1f}{tamano_mb(db):>14}"
+              f"{t_coste:>12.2f}{t_top:>16.2f}{f'{filas_coste}/{filas_top}':>10}")
+
+    if not args.conservar:
+        for db in bases.values():
+            client.drop_database(db.name)
+        print("\nBases de datos de prueba eliminadas.")
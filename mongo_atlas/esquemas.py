@@ -0,0 +1,206 @@
+import pymongo
+import random
+from faker import Faker
+
+# =========================================================
+# Esquemas de 'series', generación de datos e informes
+# =========================================================
+# Compartido por main.py y benchmark_esquemas.py: los dos cargan las mismas series y
+# lanzan los mismos pipelines, así el benchmark mide exactamente lo que ejecuta main.py.
+#   "referenciado" -> la producción vive solo en detalles_produccion y se une con $lookup
+#   "embebido"     -> cada serie lleva además su subdocumento 'produccion' y el 'coste_total'
+#                     precalculado, así los informes de coste y de EE.UU. no necesitan $lookup
+
+ESQUEMA_REFERENCIADO = "referenciado"
+ESQUEMA_EMBEBIDO = "embebido"
+ESQUEMAS = (ESQUEMA_REFERENCIADO, ESQUEMA_EMBEBIDO)
+
+# Constante de episodios por temporada (coste = presupuesto_por_episodio * temporadas * 8)
+EPISODIOS_POR_TEMPORADA = 8
+
+# Por encima de este número faker.unique se queda sin frases (o tarda cada vez más):
+# los títulos pasan a llevar un número de secuencia que garantiza que no se repiten
+MAX_TITULOS_FAKER = 1000
+
+# Colección -> [(nombre, claves)]. Sin índice en detalles_produccion.titulo cada $lookup
+# recorre la colección entera (coste series x producción); el compuesto de series sirve
+# al $match inicial de pipeline_top_eeuu (igualdad en finalizada y rango en puntuacion).
+INDICES = {
+    "detalles_produccion": [
+        ("idx_titulo", [("titulo", pymongo.ASCENDING)]),
+    ],
+    "series": [
+        ("idx_finalizada_puntuacion", [("finalizada", pymongo.ASCENDING), ("puntuacion", pymongo.ASCENDING)]),
+        # Las actualizaciones por título (actualizar_produccion/actualizar_temporadas) localizan la serie por aquí
+        ("idx_titulo", [("titulo", pymongo.ASCENDING)]),
+    ],
+}
+
+# Inicializamos Faker y Listas auxiliares
+fake = Faker()
+PLATAFORMAS = ["Netflix", "HBO Max", "Disney+", "Amazon Prime", "Apple TV+"]
+GENEROS = ["Sci-Fi", "Drama", "Comedia", "Acción", "Terror", "Documental", "Thriller"]
+PAISES = ["EE.UU.", "Reino Unido", "Corea del Sur", "España", "Alemania", "Japón", "Canadá"]
+# Nombres de ejemplo para el reparto
+NOMBRES_ACTORES = [fake.name() for _ in range(50)]
+
+# =========================================================
+# Generación de Datos
+# =========================================================
+
+def generar_serie_base(numero=None):
+    """Genera un diccionario con la estructura base."""
+    # Usamos un título único y predecible para el ejemplo
+    if numero is None:
+        titulo = fake.unique.catch_phrase().replace(".", "")
+    else:
+        titulo = f"{fake.catch_phrase().replace('.', '')} #{numero}"
+    return {
+        "titulo": titulo,
+        "plataforma": random.choice(PLATAFORMAS),
+        "temporadas": random.randint(1, 15),
+        "genero": random.sample(GENEROS, k=random.randint(1, 3)),
+        "puntuacion": round(random.uniform(5.0, 10.0), 1),
+        "finalizada": random.choice([True, False]),
+        "año_estreno": random.randint(2000, 2024)
+    }
+
+def generar_produccion(titulo):
+    """Genera el documento de detalles_produccion de una serie."""
+    return {
+        "titulo": titulo, # Campo de enlace (join key)
+        "pais_origen": random.choice(PAISES),
+        "reparto_principal": random.sample(NOMBRES_ACTORES, k=random.randint(3, 5)),
+        # Presupuesto entre 1 y 20 millones
+        "presupuesto_por_episodio": round(random.uniform(1.0, 20.0), 2)
+    }
+
+def calcular_coste_total(temporadas, presupuesto_por_episodio):
+    """Mismo cálculo que el pipeline de gasto financiero (None si falta algún dato)."""
+    if temporadas is None or presupuesto_por_episodio is None:
+        return None
+    return presupuesto_por_episodio * temporadas * EPISODIOS_POR_TEMPORADA
+
+def embeber_produccion(serie, detalles):
+    """Esquema embebido: copia la producción en la serie y precalcula su coste total."""
+    serie["produccion"] = {k: v for k, v in detalles.items() if k != "titulo"}
+    serie["coste_total"] = calcular_coste_total(serie.get("temporadas"), detalles["presupuesto_por_episodio"])
+    return serie
+
+campos_posibles = ["puntuacion", "año_estreno", "temporadas", "genero"]
+
+def generar_series(num_series, num_incompletas=0):
+    """
+    Genera las series de una en una: primero las completas y al final num_incompletas con
+    datos faltantes (las 5 primeras sin puntuación, para probar el punto 5 de main.py).
+    """
+    numerar = num_series > MAX_TITULOS_FAKER
+    completas = num_series - num_incompletas
+    for i in range(num_series):
+        serie = generar_serie_base(i if numerar else None)
+        if i >= completas:
+            if i - completas < 5:
+                del serie["puntuacion"]
+            else:
+                del serie[random.choice(campos_posibles)]
+        yield serie
+
+# =========================================================
+# Informes que dependen de la producción
+# =========================================================
+
+def pipeline_top_eeuu(esquema):
+    """Series Finalizadas, Puntuación > 8.0 y de EE.UU."""
+    if esquema == ESQUEMA_EMBEBIDO:
+        # Esquema embebido: el país ya está en la serie, una sola colección y sin $lookup
+        return [
+            {"$match": {
+                "finalizada": True,
+                "puntuacion": {"$gt": 8.0},
+                "produccion.pais_origen": "EE.UU."
+            }},
+            {"$project": {
+                "_id": 0,
+                "titulo": 1,
+                "plataforma": 1,
+                "puntuacion": 1,
+                "pais_origen": "$produccion.pais_origen",
+                "presupuesto": "$produccion.presupuesto_por_episodio"
+            }}
+        ]
+
+    return [
+        # 1. $match en la colección series (Series Finalizadas y Puntuación > 8.0)
+        {"$match": {
+            "finalizada": True,
+            "puntuacion": {"$gt": 8.0}
+        }},
+        # 2. $lookup: Unir con detalles_produccion
+        {"$lookup": {
+            "from": "detalles_produccion", # Nombre de la colección a unir
+            "localField": "titulo",         # Campo en la colección actual (series)
+            "foreignField": "titulo",       # Campo en la colección unida (detalles_produccion)
+            "as": "detalles"                # Nombre del array donde se almacenará el resultado
+        }},
+        # 3. $unwind: Descomponer el array 'detalles' (asumiendo que hay 1 a 1 por título)
+        {"$unwind": "$detalles"},
+        # 4. $match para filtrar por el campo de la colección unida (país_origen)
+        {"$match": {
+            "detalles.pais_origen": "EE.UU."
+        }},
+        # 5. $project: Limpiar y seleccionar los campos a mostrar
+        {"$project": {
+            "_id": 0,
+            "titulo": 1,
+            "plataforma": 1,
+            "puntuacion": 1,
+            "pais_origen": "$detalles.pais_origen",
+            "presupuesto": "$detalles.presupuesto_por_episodio"
+        }}
+    ]
+
+def pipeline_coste_total(esquema):
+    """Gasto financiero: título y coste total (en millones) de cada serie con producción."""
+    if esquema == ESQUEMA_EMBEBIDO:
+        # Esquema embebido: coste_total ya calculado al insertar/actualizar, sin $lookup.
+        # Todas las series llevan su producción: sin $match (no usaría ningún índice)
+        return [
+            {"$project": {
+                "_id": 0,
+                "titulo": 1,
+                "coste_total_millones": {"$round": ["$coste_total", 2]}
+            }}
+        ]
+
+    return [
+        # 1. $lookup: Unir series con detalles_produccion (Usando 'titulo')
+        {"$lookup": {
+            "from": "detalles_produccion",
+            "localField": "titulo",
+            "foreignField": "titulo",
+            "as": "produccion"
+        }},
+        # 2. $unwind: Descomponer el array de 'produccion'
+        {"$unwind": "$produccion"},
+
+        # 3. $project: Calcular el costo total y seleccionar los campos a mostrar
+        {"$project": {
+            "_id": 0,
+            "titulo": 1,
+            # Cálculo: (temporadas * 8) * presupuesto_por_episodio
+            "coste_total": {
+                "$multiply": [
+                    "$produccion.presupuesto_por_episodio",
+                    {"$multiply": ["$temporadas", EPISODIOS_POR_TEMPORADA]}
+                ]
+            },
+            # Incluimos estos campos para verificación, aunque solo pediste título y coste
+            "temporadas": 1,
+            "presupuesto_episodio": "$produccion.presupuesto_por_episodio"
+        }},
+        # 4. $project (Opcional): Simplificar la salida final a solo título y coste total
+        {"$project": {
+            "titulo": 1,
+            "coste_total_millones": {"$round": ["$coste_total", 2]} # Redondeamos a 2 decimales
+        }}
+    ]
@@ -0,0 +1,271 @@
+import mysql.connector
+import csv
+import multiprocessing as mp
+import os
+import queue
+import random
+import tempfile
+import time
+from faker import Faker
+from datetime import datetime, timedelta
+from itertools import islice
+
+# === MOTOR DE CARGA MASIVA (--bulk) ===
+# Compartido por rellenarDB.py (raíz) y db/servicios.py (contenedor): cada uno solo pone
+# su conexión, sus tablas y su CLI. Los IDs se asignan de antemano (1..N tras el TRUNCATE),
+# así las claves foráneas se calculan sin leer cursor.lastrowid fila a fila.
+
+BATCH_SIZE = 5000
+TAM_BLOQUE = 10000      # IDs por bloque con semilla propia (unidad de reparto entre procesos)
+LOTES_EN_COLA = 4       # Lotes pendientes por worker antes de que este espere al escritor
+
+# Desplazamientos para que los DNI de USUARIA y CUIDADOR no se pisen entre sí
+DNI_OFFSET_USUARIA = 10_000_000
+DNI_OFFSET_CUIDADOR = 50_000_000
+LETRAS_DNI = "TRWAGMYFPDXBNJZSQVHLCKE"
+
+# Orden de carga (respeta las claves foráneas)
+TABLAS_CARGA = ['USUARIA', 'DEPENDIENTE', 'CUIDADOR', 'CENTRO', 'SERVICIO']
+
+COLUMNAS = {
+    'USUARIA': ('IDUsuario', 'Nombre', 'Apellido', 'DNI', 'FechaNacimiento', 'Barrio', 'RentaPercapita', 'Telefono', 'Email', 'Genero'),
+    'DEPENDIENTE': ('IDDependiente', 'IDUsuario', 'Nombre', 'Apellido', 'TipoDependencia', 'FechaNacimiento', 'PerfilMedico'),
+    'CUIDADOR': ('IDCuidador', 'Nombre', 'Apellido', 'DNI', 'Telefono', 'Disponibilidad', 'Especialidad'),
+    'CENTRO': ('IDCentro', 'NombreCentro', 'Direccion', 'DescripcionCentro', 'CapacidadMaxima'),
+    'SERVICIO': ('IDServicio', 'IDUsuario', 'IDDependiente', 'IDCuidador', 'IDCentro', 'FechaHoraInicio', 'FechaHoraFin', 'PrecioBase', 'PrecioFinal', 'Estado'),
+}
+
+def dni_desde_id(id_fila, offset):
+    """ DNI válido (número + letra de control) derivado del ID: único sin usar fake.unique. """
+    numero = offset + id_fila
+    return f"{numero:08d}{LETRAS_DNI[numero % 23]}"
+
+def fecha_hoy():
+    """ "Hoy" de los datos generados (fechas de servicio y de nacimiento), a las 00:00. """
+    return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+def anios_antes(fecha, anios):
+    return fecha - timedelta(days=round(anios * 365.25))
+
+def fecha_nacimiento(fake, ctx, edad_minima, edad_maxima):
+    """ Como fake.date_of_birth, pero respecto a la fecha de referencia y no a la de hoy. """
+    hoy = ctx['ahora'].date()
+    return fake.date_between(start_date=anios_antes(hoy, edad_maxima + 1) + timedelta(days=1),
+                             end_date=anios_antes(hoy, edad_minima))
+
+def marcar_reinicio_servicios(cursor):
+    """
+    TRUNCATE no dispara los triggers de DELETE y la carga masiva los silencia: se deja en
+    SERVICIO_CAMBIOS una fila de reinicio para que sync_servicios.py rehaga los servicio:{id}
+    de Redis desde SERVICIO.
+    """
+    try:
+        cursor.execute("INSERT INTO SERVICIO_CAMBIOS (IDServicio, Operacion) VALUES (0, 'R')")
+    except mysql.connector.Error:
+        pass  # Sin registro de cambios (db/setup_sql.py no ejecutado): no hay sincronización
+
+def generar_usuarias(fake, rnd, ids, ctx):
+    for uid in ids:
+        yield (uid, fake.first_name(), fake.last_name(), dni_desde_id(uid, DNI_OFFSET_USUARIA),
+               fecha_nacimiento(fake, ctx, 18, 90), fake.city_suffix(),
+               round(rnd.uniform(10000, 60000), 2), fake.phone_number(),
+               f"{fake.user_name()}.{uid}@{fake.free_email_domain()}", rnd.choice(['Femenino', 'Masculino']))
+
+def generar_dependientes(fake, rnd, ids, ctx):
+    # Un dependiente por usuaria: IDDependiente == IDUsuario
+    for uid in ids:
+        yield (uid, uid, fake.first_name(), fake.last_name(), rnd.choice(['Niño', 'Mayor', 'Otro']),
+               fecha_nacimiento(fake, ctx, 1, 90), fake.text(max_nb_chars=50))
+
+def generar_cuidadores(fake, rnd, ids, ctx):
+    for cid in ids:
+        yield (cid, fake.first_name(), fake.last_name(), dni_desde_id(cid, DNI_OFFSET_CUIDADOR),
+               fake.phone_number(), rnd.choice(['Mañana', 'Tarde', 'Completa']),
+               rnd.choice(['Geriatría', 'Infantil', 'Fisioterapia']))
+
+def generar_centros(fake, rnd, ids, ctx):
+    for ceid in ids:
+        yield (ceid, fake.company(), fake.address(), fake.catch_phrase(), rnd.randint(10, 100))
+
+def generar_servicios(fake, rnd, ids, ctx):
+    desde = ctx['ahora'] - timedelta(days=365)
+    for sid in ids:
+        u_id = rnd.randint(1, ctx['USUARIA'])
+        inicio = fake.date_time_between(start_date=desde, end_date=ctx['ahora'])
+        fin = inicio + timedelta(hours=rnd.randint(1, ctx['horas_max']))
+        precio = round(rnd.uniform(20.00, 100.00), 2)
+        # El dependiente es siempre el de la propia usuaria (FK coherente)
+        yield (sid, u_id, u_id, rnd.randint(1, ctx['CUIDADOR']), rnd.randint(1, ctx['CENTRO']),
+               inicio, fin, precio, precio, 'Finalizado')
+
+GENERADORES = {
+    'USUARIA': generar_usuarias,
+    'DEPENDIENTE': generar_dependientes,
+    'CUIDADOR': generar_cuidadores,
+    'CENTRO': generar_centros,
+    'SERVICIO': generar_servicios,
+}
+
+def generar_shard(tabla, shard, num_shards, ctx):
+    """
+    Filas de los bloques de IDs que tocan a este shard (bloques shard, shard + num_shards, ...).
+    Cada bloque tiene su propia semilla, así el resultado es el mismo con 1 o con N procesos,
+    y los rangos de IDs son disjuntos: DNI y Email (derivados del ID) no pueden colisionar.
+    """
+    n = ctx[tabla]
+    for bloque in range(shard, (n + TAM_BLOQUE - 1) // TAM_BLOQUE, num_shards):
+        semilla = f"{ctx['seed']}:{tabla}:{bloque}"
+        fake_bloque = Faker('es_ES')
+        fake_bloque.seed_instance(semilla)
+        ids = range(bloque * TAM_BLOQUE + 1, min((bloque + 1) * TAM_BLOQUE, n) + 1)
+        yield from GENERADORES[tabla](fake_bloque, random.Random(semilla), ids, ctx)
+
+def en_lotes(filas, batch_size):
+    """ Agrupa un iterador de filas en listas de como mucho batch_size elementos. """
+    filas = iter(filas)
+    while True:
+        lote = list(islice(filas, batch_size))
+        if not lote:
+            return
+        yield lote
+
+def insertar_lote(cursor, tabla, lote):
+    """ INSERT multi-fila: mysql-connector reescribe executemany en un único VALUES (...), (...). """
+    columnas = COLUMNAS[tabla]
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(columnas))})"
+    cursor.executemany(sql, lote)
+
+def cargar_lote_load_data(cursor, tabla, lote):
+    """ Vuelca el lote a un CSV temporal y lo carga con LOAD DATA LOCAL INFILE. """
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False) as f:
+        csv.writer(f, lineterminator='\n').writerows(lote)
+        ruta = f.name
+    try:
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE '{ruta}' INTO TABLE {tabla}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+            LINES TERMINATED BY '\\n'
+            ({', '.join(COLUMNAS[tabla])})
+        """)
+    finally:
+        os.remove(ruta)
+
+def worker_generador(tabla, shard, num_shards, ctx, batch_size, cola):
+    """ Proceso generador: produce los lotes de su shard y los deja en la cola acotada. """
+    for lote in en_lotes(generar_shard(tabla, shard, num_shards, ctx), batch_size):
+        cola.put(lote)
+    cola.put(None)  # Marca de fin de este shard
+
+def lotes_en_paralelo(tabla, ctx, batch_size, workers):
+    """
+    Reparte la generación de la tabla entre varios procesos. La cola tiene tamaño
+    máximo, así que si MySQL va más lento que Faker los workers esperan y la memoria no crece.
+    """
+    cola = mp.Queue(maxsize=workers * LOTES_EN_COLA)
+    procesos = [mp.Process(target=worker_generador, args=(tabla, w, workers, ctx, batch_size, cola), daemon=True)
+                for w in range(workers)]
+    for p in procesos:
+        p.start()
+    try:
+        pendientes = workers
+        while pendientes:
+            try:
+                lote = cola.get(timeout=1)
+            except queue.Empty:
+                if any(p.exitcode not in (None, 0) for p in procesos):
+                    raise RuntimeError(f"Un proceso generador de {tabla} ha fallado.")
+                continue
+            if lote is None:
+                pendientes -= 1
+            else:
+                yield lote
+    finally:
+        for p in procesos:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+
+def cargar_tabla(conn, tabla, lotes, load_data=False):
+    """ Escribe los lotes (commit por lote) e informa de filas/segundo. """
+    cursor = conn.cursor()
+    escribir = cargar_lote_load_data if load_data else insertar_lote
+    total = 0
+    inicio = time.perf_counter()
+    for lote in lotes:
+        escribir(cursor, tabla, lote)
+        conn.commit()
+        total += len(lote)
+    segundos = max(time.perf_counter() - inicio, 1e-9)
+    print(f"  {tabla}: {total} filas en {segundos:.1f}s ({total / segundos:,.0f} filas/s)")
+    cursor.close()
+    return total
+
+def cargar_todo(conn, args, tablas_vaciar, horas_max):
+    """
+    Vacía 'tablas_vaciar' y carga TABLAS_CARGA según los argumentos de añadir_argumentos().
+    'horas_max' es la duración máxima de un servicio. Devuelve (filas, segundos).
+    """
+    cursor = conn.cursor()
+    print(" -> Limpiando datos antiguos...")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0;")
+    for tabla in tablas_vaciar:
+        try:
+            cursor.execute(f"TRUNCATE TABLE {tabla}")
+        except mysql.connector.Error:
+            pass
+    # Las FK y UNIQUE ya son coherentes por construcción: se desactiva su chequeo durante la carga.
+    # Con @carga_masiva los triggers de SERVICIO no escriben en SERVICIO_CAMBIOS (una fila por
+    # servicio cargado): al terminar se deja una sola marca de reinicio y la sincronización
+    # recarga SERVICIO entero
+    cursor.execute("SET UNIQUE_CHECKS = 0;")
+    cursor.execute("SET @carga_masiva = 1;")
+
+    # Contexto común a todos los shards (tamaños de tabla, semilla y fecha de referencia)
+    ctx = {
+        'USUARIA': args.usuarias, 'DEPENDIENTE': args.usuarias, 'CUIDADOR': args.cuidadores,
+        'CENTRO': args.centros, 'SERVICIO': args.servicios,
+        'seed': args.seed, 'ahora': args.fecha_referencia, 'horas_max': horas_max,
+    }
+    inicio = time.perf_counter()
+    total = 0
+    try:
+        for tabla in TABLAS_CARGA:
+            if args.workers > 1:
+                lotes = lotes_en_paralelo(tabla, ctx, args.batch_size, args.workers)
+            else:
+                lotes = en_lotes(generar_shard(tabla, 0, 1, ctx), args.batch_size)
+            total += cargar_tabla(conn, tabla, lotes, args.load_data)
+    finally:
+        # También si la carga falla a medias: SERVICIO ya no es lo que hay en Redis
+        try:
+            cursor.execute("SET @carga_masiva = NULL;")
+            if 'SERVICIO' in tablas_vaciar:
+                marcar_reinicio_servicios(cursor)
+                conn.commit()
+        except mysql.connector.Error:
+            pass  # Conexión perdida: la variable desaparece con la sesión
+
+    cursor.execute("SET UNIQUE_CHECKS = 1;")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+    cursor.close()
+    return total, max(time.perf_counter() - inicio, 1e-9)
+
+def añadir_argumentos(parser, usuarias, cuidadores, centros, servicios):
+    """ Opciones de la carga masiva (los valores por defecto los pone cada script). """
+    parser.add_argument('--bulk', action='store_true', help="Carga masiva por lotes con IDs preasignados.")
+    parser.add_argument('--usuarias', type=int, default=usuarias, help="Filas de USUARIA (y de DEPENDIENTE).")
+    parser.add_argument('--cuidadores', type=int, default=cuidadores, help="Filas de CUIDADOR.")
+    parser.add_argument('--centros', type=int, default=centros, help="Filas de CENTRO.")
+    parser.add_argument('--servicios', type=int, default=servicios, help="Filas de SERVICIO.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Filas por lote (y por commit).")
+    parser.add_argument('--load-data', action='store_true',
+                        help="Usar LOAD DATA LOCAL INFILE desde CSV (requiere local_infile=ON en el servidor).")
+    parser.add_argument('--workers', type=int, default=1, help="Procesos generadores de Faker (1 = sin paralelismo).")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla base: misma semilla, mismos datos.")
+    # Por defecto hoy: las fechas caen en la ventana de particiones de crearDB.py y en sus
+    # consultas de "último mes". Para repetir exactamente una carga de otro día, --seed y
+    # --fecha-referencia juntos
+    parser.add_argument('--fecha-referencia', type=datetime.fromisoformat, default=fecha_hoy(),
+                        help="Fecha 'actual' de los datos (AAAA-MM-DD, por defecto hoy).")
+    return parser
@@ -0,0 +1,98 @@
+import mysql.connector
+import mysql.connector.pooling
+import redis
+import json
+import os
+import threading
+import time
+
+# === CONEXIONES COMPARTIDAS (MySQL + Redis) ===
+# Versión para el contenedor de la app (solo monta python-app/): un pool de MySQL y un
+# ConnectionPool de Redis configurados desde las variables de entorno de docker-compose.
+# conn.close() sobre una conexión del pool la devuelve al pool en lugar de cerrarla.
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+DB_HOST = os.getenv("MYSQL_HOST", "localhost")
+DB_NAME = os.getenv("MYSQL_DB", "CENTROCUIDADOFAMILIAR")
+DB_USER = os.getenv("MYSQL_USER", "root")
+DB_PASS = os.getenv("MYSQL_PASSWORD")
+
+POOL_SIZE = int(os.getenv("POOL_SIZE", "5"))
+POOL_TIMEOUT = float(os.getenv("POOL_TIMEOUT", "10"))  # Segundos esperando una conexión libre
+
+_lock = threading.Lock()
+_mysql_pool = None
+_redis_pools = {}
+
+# Mismos nombres y firmas que conexiones.py de la raíz (get_mysql_connection, get_redis,
+# health_check, pool_metrics); aquí solo hay una base de datos y no hay PostgreSQL ni Mongo.
+
+def _wait_for(get, error, timeout):
+    """ Los pools no esperan si están agotados: reintentamos hasta el timeout. """
+    limit = time.monotonic() + timeout
+    while True:
+        try:
+            return get()
+        except error:
+            if time.monotonic() >= limit:
+                raise
+            time.sleep(0.01)
+
+def get_mysql_connection(timeout=POOL_TIMEOUT):
+    """ Conexión del pool de MySQL (se crea en el primer uso); conn.close() la devuelve al pool. """
+    global _mysql_pool
+    with _lock:
+        if _mysql_pool is None:
+            _mysql_pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name="python_app", pool_size=POOL_SIZE, pool_reset_session=True,
+                host=DB_HOST, user=DB_USER, password=DB_PASS, database=DB_NAME
+            )
+    return _wait_for(_mysql_pool.get_connection, mysql.connector.errors.PoolError, timeout)
+
+def get_redis(**config):
+    """ Cliente Redis (decode_responses=True) sobre un ConnectionPool por ajustes (timeouts...). """
+    key = tuple(sorted(config.items()))
+    with _lock:
+        if key not in _redis_pools:
+            _redis_pools[key] = redis.ConnectionPool(host=REDIS_HOST, port=REDIS_PORT,
+                                                     max_connections=POOL_SIZE * 4,
+                                                     decode_responses=True, **config)
+        return redis.Redis(connection_pool=_redis_pools[key])
+
+def _timed(check):
+    start = time.perf_counter()
+    try:
+        check()
+        return {"estado": "ok", "ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        return {"estado": "error", "error": str(e)}
+
+def _check_mysql():
+    conn = get_mysql_connection()
+    try:
+        conn.ping(reconnect=False)
+    finally:
+        conn.close()
+
+def health_check(backends=("MySQL", "Redis")):
+    """ PING a Redis y a MySQL con su latencia. """
+    checks = {"MySQL": _check_mysql, "Redis": lambda: get_redis().ping()}
+    return {name: _timed(checks[name]) for name in backends}
+
+def pool_metrics():
+    """ Tamaño y uso de los pools creados en este proceso. """
+    metrics = {"MySQL": None, "Redis": {}}
+    if _mysql_pool is not None:
+        idle = _mysql_pool._cnx_queue.qsize()
+        metrics["MySQL"] = {"tamano": _mysql_pool.pool_size, "libres": idle,
+                            "en_uso": _mysql_pool.pool_size - idle}
+    for key, pool in _redis_pools.items():
+        metrics["Redis"][", ".join(f"{k}={v}" for k, v in key) or "defecto"] = {
+            "tamano": pool.max_connections,
+            "libres": len(pool._available_connections),
+            "en_uso": len(pool._in_use_connections)}
+    return metrics
+
+if __name__ == "__main__":
+    print(json.dumps({"salud": health_check(), "pools": pool_metrics()}, indent=2, ensure_ascii=False))
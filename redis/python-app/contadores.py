@@ -0,0 +1,110 @@
+import argparse
+import json
+
+from redis.commands.search.aggregation import AggregateRequest
+import redis.commands.search.reducers as reducers
+
+import conexiones
+
+# === AGREGADOS MATERIALIZADOS POR CENTRO ===
+# Cada vez que un cargador escribe un documento servicio:{id}, en el MISMO pipeline se
+# actualizan los contadores de su centro (HINCRBY / HINCRBYFLOAT):
+#   stats:centro:{centro} -> servicios, ingresos, duracion (suma de minutos)
+#   stats:centros         -> conjunto de centros con contadores
+# El panel lee O(centros) en lugar de agregar O(servicios) con FT.AGGREGATE; la
+# reconciliación recalcula los contadores desde el índice si alguna vez se desvían.
+# Conexión a Redis (pool y variables de entorno) en conexiones.py
+
+PREFIJO = "stats:centro:"
+CLAVE_CENTROS = "stats:centros"
+INDICE = "idx:servicios"
+
+def sumar(pipe, centro, precio, duracion, signo=1):
+    """ Encola en 'pipe' la suma (signo=1) o resta (signo=-1) de un servicio a su centro. """
+    clave = f"{PREFIJO}{centro}"
+    pipe.hincrby(clave, "servicios", signo)
+    pipe.hincrbyfloat(clave, "ingresos", signo * float(precio or 0))
+    pipe.hincrby(clave, "duracion", signo * int(duracion or 0))
+    pipe.sadd(CLAVE_CENTROS, centro)
+    return 4
+
+def sumar_documento(pipe, doc, signo=1):
+    """ Igual que sumar() a partir de un documento servicio:{id} (ver documento_servicio). """
+    return sumar(pipe, doc["centro"], doc["precio"], doc["duracion_minutos"], signo)
+
+def reiniciar(r, pipe=None):
+    """ Borra todos los contadores (antes de una recarga completa). """
+    destino = pipe if pipe is not None else r.pipeline(transaction=True)
+    for centro in r.smembers(CLAVE_CENTROS):
+        destino.delete(f"{PREFIJO}{centro}")
+    destino.delete(CLAVE_CENTROS)
+    if pipe is None:
+        destino.execute()
+
+def leer_panel(r):
+    """ Estadísticas por centro leyendo solo los contadores: un HGETALL por centro. """
+    centros = sorted(r.smembers(CLAVE_CENTROS))
+    pipe = r.pipeline(transaction=False)
+    for centro in centros:
+        pipe.hgetall(f"{PREFIJO}{centro}")
+    panel = []
+    for centro, valores in zip(centros, pipe.execute()):
+        servicios = int(valores.get("servicios", 0))
+        if servicios <= 0:
+            continue
+        panel.append({
+            "centro": centro,
+            "servicios": servicios,
+            "ingresos": round(float(valores.get("ingresos", 0)), 2),
+            "duracion_media": round(int(valores.get("duracion", 0)) / servicios, 1),
+        })
+    panel.sort(key=lambda fila: fila["servicios"], reverse=True)
+    return panel
+
+def agregar_desde_indice(r, indice=INDICE):
+    """ Recalcula los agregados por centro con FT.AGGREGATE ... GROUPBY sobre el índice. """
+    req = AggregateRequest("*").group_by(
+        ["@centro"],
+        reducers.count().alias("servicios"),
+        reducers.sum("@precio").alias("ingresos"),
+        reducers.sum("@duracion").alias("duracion"),
+    )
+    res = r.ft(indice).aggregate(req)
+    filas = [dict(zip(row[::2], row[1::2])) for row in res.rows]
+    return {f["centro"]: f for f in filas if f.get("centro") is not None}
+
+def reconciliar(r, indice=INDICE):
+    """
+    Sustituye los contadores por los valores agregados desde el índice, de forma atómica.
+    Devuelve los centros cuyos contadores no coincidían con el índice.
+    """
+    antes = {fila["centro"]: fila for fila in leer_panel(r)}
+    agregados = agregar_desde_indice(r, indice)
+
+    pipe = r.pipeline(transaction=True)
+    reiniciar(r, pipe)
+    for centro, f in agregados.items():
+        pipe.hset(f"{PREFIJO}{centro}", mapping={
+            "servicios": int(f["servicios"]),
+            "ingresos": float(f["ingresos"]),
+            "duracion": int(float(f["duracion"])),
+        })
+        pipe.sadd(CLAVE_CENTROS, centro)
+    pipe.execute()
+
+    despues = {fila["centro"]: fila for fila in leer_panel(r)}
+    return sorted(c for c in set(antes) | set(despues) if antes.get(c) != despues.get(c))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Contadores por centro de los servicios en Redis.")
+    parser.add_argument("--reconciliar", action="store_true",
+                        help=f"Reconstruir los contadores desde el índice '{INDICE}'.")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    r = conexiones.get_redis()
+    if args.reconciliar:
+        diferencias = reconciliar(r)
+        print(f"Contadores reconstruidos desde '{INDICE}'. Centros corregidos: {diferencias or 'ninguno'}")
+    print(json.dumps(leer_panel(r), indent=2, ensure_ascii=False))
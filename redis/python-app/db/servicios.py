@@ -1,8 +1,16 @@
 import mysql.connector
+import argparse
 import os
 import random
+import sys
 from faker import Faker
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+# Módulos de la app (carga_masiva.py, conexiones.py, versiones_cache.py) en el directorio padre
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import carga_masiva
+import conexiones
+import versiones_cache
 
 # === CONFIGURACIÓN ===
 # Usamos las variables de entorno que Docker inyecta
@@ -14,14 +22,20 @@ DB_PASS = os.getenv("MYSQL_PASSWORD", "0853")
 
 NUM_BASE_RECORDS = 20 
 NUM_SERVICIOS = 50
+NUM_CENTROS = 5
+HORAS_MAX_SERVICIO = 5  # Duración máxima de un servicio generado
 fake = Faker('es_ES')
 
-def connect():
+# Tablas que vacía y rellena este script
+TABLAS_POBLADAS = ["RESENA", "TRANSACCION", "SERVICIO", "DEPENDIENTE", "CUIDADOR", "CENTRO", "USUARIA", "REGISTRO_TIEMPO"]
+
+def connect(**kwargs):
     return mysql.connector.connect(
         host=DB_HOST,
         user=DB_USER,
         password=DB_PASS,
-        database=DB_NAME
+        database=DB_NAME,
+        **kwargs
     )
 
 def main():
@@ -40,6 +54,7 @@ def main():
             except:
                 pass
         cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+        carga_masiva.marcar_reinicio_servicios(cursor)
 
         # 1. Insertar USUARIOS
         print(" -> Creando Usuarios...")
@@ -71,7 +86,7 @@ def main():
         # 4. Insertar CENTROS
         print(" -> Creando Centros...")
         centros_ids = []
-        for _ in range(5):
+        for _ in range(NUM_CENTROS):
             sql = "INSERT INTO CENTRO (NombreCentro, Direccion, DescripcionCentro, CapacidadMaxima) VALUES (%s, %s, %s, %s)"
             val = (fake.company(), fake.address(), fake.catch_phrase(), random.randint(10, 100))
             cursor.execute(sql, val)
@@ -101,6 +116,7 @@ def main():
             cursor.execute(sql, val)
 
         conn.commit()
+        versiones_cache.invalidar(conexiones.get_redis(), *TABLAS_POBLADAS)
         print(f"\n✅ ¡ÉXITO! {NUM_SERVICIOS} servicios insertados. Listo para Redis.")
 
     except mysql.connector.Error as err:
@@ -108,5 +124,34 @@ def main():
     finally:
         if conn: conn.close()
 
+# ----------------------------------------------------------------------
+# MODO CARGA MASIVA (--bulk): el motor está en carga_masiva.py
+# ----------------------------------------------------------------------
+
+def main_bulk(args):
+    print(f"--- Carga masiva en {DB_HOST} (lote={args.batch_size}, workers={args.workers}, "
+          f"{'LOAD DATA' if args.load_data else 'executemany'}) ---")
+    conn = None
+    try:
+        conn = connect(allow_local_infile=args.load_data)
+        total, segundos = carga_masiva.cargar_todo(conn, args, TABLAS_POBLADAS, HORAS_MAX_SERVICIO)
+        versiones_cache.invalidar(conexiones.get_redis(), *TABLAS_POBLADAS)
+        print(f"\n✅ ¡ÉXITO! {total} filas en {segundos:.1f}s ({total / segundos:,.0f} filas/s en total). Listo para Redis.")
+
+    except mysql.connector.Error as err:
+        print(f"\n❌ Error MySQL: {err}")
+    finally:
+        if conn: conn.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rellena CENTROCUIDADOFAMILIAR con datos de Faker.")
+    carga_masiva.añadir_argumentos(parser, usuarias=NUM_BASE_RECORDS, cuidadores=NUM_BASE_RECORDS,
+                                   centros=NUM_CENTROS, servicios=NUM_SERVICIOS)
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.bulk:
+        main_bulk(args)
+    else:
+        main()
\ No newline at end of file
@@ -8,6 +8,53 @@ DB_NAME = os.getenv("MYSQL_DB", "CENTROCUIDADOFAMILIAR")
 DB_USER = os.getenv("MYSQL_USER", "root")
 DB_PASS = os.getenv("MYSQL_PASSWORD")
 
+# === REGISTRO DE CAMBIOS DE SERVICIO (para la sincronización incremental con Redis) ===
+# Cada INSERT/UPDATE/DELETE sobre SERVICIO deja una fila aquí. IDCambio es la marca de agua
+# que sync_servicios.py guarda en Redis: solo se releen los servicios con cambios posteriores.
+# Operacion: I/U/D desde los triggers, o R cuando un cargador vacía y recarga SERVICIO.
+# Las cargas masivas (carga_masiva.py) ponen @carga_masiva en su sesión: los triggers no
+# escriben una fila por servicio cargado y la sincronización recarga todo al ver la R.
+SQL_SERVICIO_CAMBIOS = """
+CREATE TABLE IF NOT EXISTS SERVICIO_CAMBIOS (
+    IDCambio BIGINT PRIMARY KEY AUTO_INCREMENT,
+    IDServicio INT NOT NULL,
+    Operacion CHAR(1) NOT NULL,
+    FechaCambio DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_cambios_fecha (FechaCambio)
+);
+"""
+
+TRIGGERS_SERVICIO = {
+    "trg_servicio_cambios_ins": ("INSERT", "NEW", "I"),
+    "trg_servicio_cambios_upd": ("UPDATE", "NEW", "U"),
+    "trg_servicio_cambios_del": ("DELETE", "OLD", "D"),
+}
+
+# Marca que identifica la versión actual del cuerpo de los triggers (ver crear_registro_cambios)
+VARIABLE_CARGA = "@carga_masiva"
+
+def crear_registro_cambios(cursor):
+    """ Crea SERVICIO_CAMBIOS y los triggers que la alimentan (rehace los de una versión anterior). """
+    cursor.execute(SQL_SERVICIO_CAMBIOS)
+    cursor.execute(
+        "SELECT TRIGGER_NAME, ACTION_STATEMENT FROM information_schema.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()"
+    )
+    existentes = dict(cursor.fetchall())
+    for nombre, (evento, fila, operacion) in TRIGGERS_SERVICIO.items():
+        if nombre in existentes:
+            if VARIABLE_CARGA in existentes[nombre]:
+                print(f" -> Trigger {nombre} ya existe.")
+                continue
+            # Versión sin la comprobación de carga masiva: se sustituye
+            cursor.execute(f"DROP TRIGGER {nombre}")
+        cursor.execute(
+            f"CREATE TRIGGER {nombre} AFTER {evento} ON SERVICIO FOR EACH ROW "
+            f"BEGIN IF {VARIABLE_CARGA} IS NULL THEN "
+            f"INSERT INTO SERVICIO_CAMBIOS (IDServicio, Operacion) VALUES ({fila}.IDServicio, '{operacion}'); "
+            f"END IF; END"
+        )
+        print(f" -> Trigger {nombre} creado.")
+
 def main():
     conn = None
     try:
@@ -32,6 +79,10 @@ def main():
         conn.commit()
         print("✅ Tabla 'REGISTRO_TIEMPO' verificada/creada correctamente.")
 
+        crear_registro_cambios(cursor)
+        conn.commit()
+        print("✅ Registro de cambios 'SERVICIO_CAMBIOS' y sus triggers verificados/creados.")
+
         # 2. VERIFICAR DATOS EXISTENTES (Solo lectura)
         # Comprobamos cuántos datos tienes ya en tu MySQL real
         tablas_a_verificar = ["USUARIA", "CUIDADOR", "CENTRO", "SERVICIO"]
@@ -1,29 +1,47 @@
-import redis
 import mysql.connector
 import os
-import time
-from datetime import datetime
-from redis.commands.search.field import TextField, NumericField, TagField
+from redis.commands.search.field import TextField, NumericField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
-from redis.commands.search.query import Query
+from redis.commands.search.aggregation import AggregateRequest
+from migracion import migrar, resumen
+from indices import crear_indice_versionado
+import conexiones
+import versiones_cache
 
 # === CONFIGURACIÓN ===
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-DB_HOST = os.getenv("MYSQL_HOST", "localhost")
-DB_NAME = os.getenv("MYSQL_DB", "CENTROCUIDADOFAMILIAR")
-DB_USER = os.getenv("MYSQL_USER", "root")
-DB_PASS = os.getenv("MYSQL_PASSWORD")
+# Redis y MySQL: conexiones (pools) y sus variables de entorno en conexiones.py
+
+# Cargas MySQL -> Redis con los campos calculados en el SELECT (1) o en Python (0)
+CARGA_EN_SQL = os.getenv("CARGA_EN_SQL", "1") == "1"
+
+# Variante del paso 1: MySQL calcula la duración y los campos desnormalizados y cada fila
+# llega como tupla (clave, id, usuario, cuidador, centro, duracion) lista para HSET.
+SQL_CARGA_CALCULADA = """
+    SELECT
+        CONCAT('datos_mysql:servicio:', s.IDServicio),
+        s.IDServicio,
+        COALESCE(u.Nombre, ''),
+        COALESCE(c.Nombre, ''),
+        COALESCE(cen.NombreCentro, 'Domicilio'),
+        COALESCE(GREATEST(TIMESTAMPDIFF(MINUTE, s.FechaHoraInicio, s.FechaHoraFin), 0), 0)
+    FROM SERVICIO s
+    LEFT JOIN USUARIA u ON s.IDUsuario = u.IDUsuario
+    LEFT JOIN CUIDADOR c ON s.IDCuidador = c.IDCuidador
+    LEFT JOIN CENTRO cen ON s.IDCentro = cen.IDCentro
+    WHERE s.FechaHoraFin IS NOT NULL
+"""
+
+# Filas por página al volcar los resultados de Redis en MySQL (paso 3)
+PAGINA_MIGRACION = int(os.getenv("PAGINA_MIGRACION", "1000"))
 
 def log(titulo, msg):
     print(f"\n[{titulo}] {msg}")
 
 def conectar():
     # Conectamos a Redis (decodificando respuestas para tener strings)
-    r = redis.Redis(host=REDIS_HOST, port=6379, decode_responses=True)
-    # Conectamos a MySQL
-    conn = mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASS, database=DB_NAME
-    )
+    r = conexiones.get_redis()
+    # Conectamos a MySQL (conexión del pool; conn.close() la devuelve)
+    conn = conexiones.get_mysql_connection()
     return r, conn
 
 # ---------------------------------------------------------
@@ -31,29 +49,8 @@ def conectar():
 # ---------------------------------------------------------
 def paso_1_cargar_datos(r, conn):
     log("PASO 1", "Extrayendo de MySQL y cargando en Redis...")
-    cursor = conn.cursor(dictionary=True)
-    
-    # Obtenemos datos crudos de MySQL
-    cursor.execute("""
-        SELECT 
-            s.IDServicio, u.Nombre as NomUsu, c.Nombre as NomCui, 
-            cen.NombreCentro, s.FechaHoraInicio, s.FechaHoraFin
-        FROM SERVICIO s
-        LEFT JOIN USUARIA u ON s.IDUsuario = u.IDUsuario
-        LEFT JOIN CUIDADOR c ON s.IDCuidador = c.IDCuidador
-        LEFT JOIN CENTRO cen ON s.IDCentro = cen.IDCentro
-        WHERE s.FechaHoraFin IS NOT NULL
-    """)
-    servicios = cursor.fetchall()
-    
-    if not servicios:
-        print("⚠️ No hay datos en MySQL para cargar.")
-        return 0
 
-    pipeline = r.pipeline()
-    count = 0
-    
-    for serv in servicios:
+    def escribir(pipe, serv):
         # Transformación (Python): Calcular duración
         inicio = serv['FechaHoraInicio']
         fin = serv['FechaHoraFin']
@@ -65,20 +62,44 @@ def paso_1_cargar_datos(r, conn):
         # Estructura para Redis (Hash)
         data = {
             "id": serv['IDServicio'],
-            "usuario": serv['NomUsu'],
-            "cuidador": serv['NomCui'],
+            # Sin usuaria o cuidador: cadena vacía, igual que el COALESCE de SQL_CARGA_CALCULADA
+            "usuario": serv['NomUsu'] or '',
+            "cuidador": serv['NomCui'] or '',
             "centro": serv['NombreCentro'] if serv['NombreCentro'] else "Domicilio",
             "duracion": minutos
         }
         
         # Convertimos todo a string para Redis
         mapping = {k: str(v) for k, v in data.items()}
-        pipeline.hset(key, mapping=mapping)
-        count += 1
-        
-    pipeline.execute()
-    log("REDIS", f"✅ {count} registros cargados en Redis bajo 'datos_mysql:servicio:*'.")
-    return count
+        pipe.hset(key, mapping=mapping)
+
+    def escribir_tupla(pipe, f):
+        # La fila ya trae la clave y los valores finales: HSET directo, sin dict ni str()
+        pipe.execute_command("HSET", f[0], "id", f[1], "usuario", f[2],
+                             "cuidador", f[3], "centro", f[4], "duracion", f[5])
+
+    # Leemos de MySQL por bloques (cursor sin buffer) y vaciamos el pipeline cada FLUSH comandos
+    if CARGA_EN_SQL:
+        stats = migrar(conn, r, SQL_CARGA_CALCULADA, escribir_tupla, dictionary=False)
+    else:
+        stats = migrar(conn, r, """
+            SELECT 
+                s.IDServicio, u.Nombre as NomUsu, c.Nombre as NomCui, 
+                cen.NombreCentro, s.FechaHoraInicio, s.FechaHoraFin
+            FROM SERVICIO s
+            LEFT JOIN USUARIA u ON s.IDUsuario = u.IDUsuario
+            LEFT JOIN CUIDADOR c ON s.IDCuidador = c.IDCuidador
+            LEFT JOIN CENTRO cen ON s.IDCentro = cen.IDCentro
+            WHERE s.FechaHoraFin IS NOT NULL
+        """, escribir)
+    
+    if not stats['filas']:
+        print("⚠️ No hay datos en MySQL para cargar.")
+        return 0
+
+    log("REDIS", f"✅ {stats['filas']} registros cargados en Redis bajo 'datos_mysql:servicio:*'.")
+    log("MIGRACIÓN", resumen(stats))
+    return stats['filas']
 
 # ---------------------------------------------------------
 # PASO 2: INDEXACIÓN (Preparar Redis para consultas)
@@ -97,18 +118,33 @@ def paso_2_crear_indice(r):
     definition = IndexDefinition(prefix=["datos_mysql:servicio:"], index_type=IndexType.HASH)
 
     try:
-        # Intentamos borrar el índice si ya existe para empezar limpio
-        try:
-            r.ft(index_name).dropindex()
-        except:
-            pass
-            
-        # Creamos el índice
-        r.ft(index_name).create_index(schema, definition=definition)
-        log("REDIS SEARCH", f"✅ Índice '{index_name}' creado. Ahora Redis puede consultar sus propios datos.")
+        # Creamos una versión nueva del índice y, cuando termina de indexar, el alias
+        # 'idx:tiempos_servicio' pasa a apuntar a ella (la anterior se sigue usando hasta entonces)
+        version = crear_indice_versionado(r, index_name, schema, definition)
+        log("REDIS SEARCH", f"✅ Índice '{version}' creado y publicado como '{index_name}'. Ahora Redis puede consultar sus propios datos.")
     except Exception as e:
         print(f"Error creando índice: {e}")
 
+def paginas_agregado(r, indice, consulta, campos, pagina=None):
+    """
+    Recorre TODOS los resultados de 'consulta' con FT.AGGREGATE ... WITHCURSOR y genera
+    páginas (listas de diccionarios campo -> valor). Si se deja a medias, borra el cursor.
+    """
+    pagina = pagina or PAGINA_MIGRACION
+    req = AggregateRequest(consulta).load(*campos).cursor(count=pagina)
+    res = r.ft(indice).aggregate(req)
+    try:
+        while True:
+            if res.rows:
+                yield [dict(zip(fila[::2], fila[1::2])) for fila in res.rows]
+            if not res.cursor or res.cursor.cid == 0:
+                return
+            res.cursor.count = pagina
+            res = r.ft(indice).aggregate(res.cursor)
+    finally:
+        if res.cursor and res.cursor.cid != 0:
+            r.execute_command("FT.CURSOR", "DEL", indice, res.cursor.cid)
+
 # ---------------------------------------------------------
 # PASO 3: REDIS HACE EL TRABAJO PARA LA MIGRACIÓN
 # ---------------------------------------------------------
@@ -117,47 +153,51 @@ def paso_3_consultar_y_migrar(r, conn):
     
     # === AQUÍ ESTÁ LA CLAVE DE TU PREGUNTA ===
     # En lugar de migrar todo ciegamente, le pedimos a Redis que filtre.
-    # Consulta: "Dáme todos los servicios con duración mayor a 0 minutos, ordenados por duración descendente"
-    
-    q = Query("@duracion:[(0 +inf]").sort_by("duracion", asc=False)
-    
-    # Ejecutamos la consulta contra la base de datos de Redis
-    res = r.ft("idx:tiempos_servicio").search(q)
-    
-    print(f" -> Redis encontró {res.total} servicios válidos (duración > 0).")
+    # Consulta: "Dame todos los servicios con duración mayor a 0 minutos"
+    # FT.SEARCH sin LIMIT solo devuelve los 10 primeros; con FT.AGGREGATE ... WITHCURSOR
+    # Redis entrega TODOS los resultados en páginas de PAGINA_MIGRACION filas y cada página
+    # se escribe en MySQL nada más llegar (memoria acotada sea cual sea el volumen).
     
-    if res.total == 0:
-        return
-
-    # Preparamos los datos para MySQL
-    datos_finales = []
-    for doc in res.docs:
-        # doc es el objeto que Redis nos devuelve tras su consulta interna
-        datos_finales.append((
-            doc.id.split(":")[-1], # ID original extraído de la clave
-            doc.usuario,
-            doc.cuidador,
-            doc.centro,
-            doc.duracion
-        ))
-
-    # Escribimos en la tabla final de MySQL
-    cursor = conn.cursor()
     sql_insert = """
         INSERT INTO REGISTRO_TIEMPO 
         (IDServicioOriginal, NombreUsuario, NombreCuidador, NombreCentro, DuracionMinutos, FechaCalculo)
         VALUES (%s, %s, %s, %s, %s, NOW())
         ON DUPLICATE KEY UPDATE DuracionMinutos = VALUES(DuracionMinutos), FechaCalculo = NOW()
     """
-    
+    cursor = conn.cursor()
+    total, paginas = 0, 0
+
     try:
-        cursor.executemany(sql_insert, datos_finales)
-        conn.commit()
-        log("MYSQL", f"✅ {cursor.rowcount} registros (filtrados por Redis) insertados en REGISTRO_TIEMPO.")
+        for pagina in paginas_agregado(r, "idx:tiempos_servicio", "@duracion:[(0 +inf]",
+                                       ("@__key", "@usuario", "@cuidador", "@centro", "@duracion")):
+            # Preparamos los datos para MySQL
+            datos_finales = [(
+                doc['__key'].split(":")[-1], # ID original extraído de la clave
+                doc.get('usuario'),
+                doc.get('cuidador'),
+                doc.get('centro'),
+                doc.get('duracion')
+            ) for doc in pagina]
+
+            # Escribimos la página en la tabla final de MySQL
+            cursor.executemany(sql_insert, datos_finales)
+            conn.commit()
+            total += len(datos_finales)
+            paginas += 1
+
+        print(f" -> Redis encontró {total} servicios válidos (duración > 0).")
+        if total == 0:
+            return
+
+        # Invalida la caché de consultas sobre REGISTRO_TIEMPO (ver cache_consultas.py)
+        versiones_cache.invalidar(r, "REGISTRO_TIEMPO")
+
+        log("MYSQL", f"✅ {total} registros (filtrados por Redis) insertados en REGISTRO_TIEMPO "
+                     f"en {paginas} páginas de hasta {PAGINA_MIGRACION}.")
         
         # Muestra final
         print("\n--- Muestra de la Tabla Final en MySQL ---")
-        cursor.execute("SELECT * FROM REGISTRO_TIEMPO LIMIT 5")
+        cursor.execute("SELECT * FROM REGISTRO_TIEMPO ORDER BY DuracionMinutos DESC LIMIT 5")
         for row in cursor.fetchall():
             print(row)
             
@@ -172,8 +212,6 @@ def main():
         # Flujo completo
         if paso_1_cargar_datos(r, conn) > 0:
             paso_2_crear_indice(r)
-            # Esperamos un micro-segundo para asegurar que el índice se actualice
-            time.sleep(0.5) 
             paso_3_consultar_y_migrar(r, conn)
         
     except Exception as e:
@@ -0,0 +1,63 @@
+import os
+import time
+
+import redis
+
+# === ÍNDICES RediSearch VERSIONADOS DETRÁS DE UN ALIAS ===
+# Las consultas usan siempre el alias (idx:servicios, idx:tiempos_servicio, ...). Reconstruir
+# crea un índice nuevo (alias:v1, alias:v2, ...), espera a que FT.INFO diga que ha terminado
+# de indexar, mueve el alias con FT.ALIASUPDATE (atómico) y solo entonces borra el anterior.
+# Así ninguna búsqueda ve un índice a medio construir y no hacen falta esperas fijas.
+
+TIMEOUT_INDEXADO = float(os.getenv("REDIS_TIMEOUT_INDEXADO", "300"))
+
+def indices_existentes(r):
+    return set(r.execute_command("FT._LIST"))
+
+def indice_de_alias(r, alias):
+    """ Índice real al que apunta el alias (o el propio nombre si es un índice antiguo sin alias). """
+    try:
+        return r.ft(alias).info()["index_name"]
+    except redis.ResponseError:
+        return None
+
+def indexado_completo(info):
+    return float(info.get("percent_indexed", 1)) >= 1 and str(info.get("indexing", 0)) in ("0", "0.0")
+
+def esperar_indexado(r, indice, timeout=TIMEOUT_INDEXADO, intervalo=0.05):
+    """ Sondea FT.INFO hasta que percent_indexed llega a 1 e indexing a 0. """
+    limite = time.monotonic() + timeout
+    while True:
+        if indexado_completo(r.ft(indice).info()):
+            return True
+        if time.monotonic() >= limite:
+            return False
+        time.sleep(intervalo)
+        intervalo = min(intervalo * 2, 1)
+
+def crear_indice_versionado(r, alias, schema, definition, timeout=TIMEOUT_INDEXADO):
+    """
+    Construye una nueva versión del índice y, cuando está completa, la publica en el alias.
+    Devuelve el nombre de la versión nueva. Si no termina a tiempo, se borra y el alias
+    sigue apuntando a la versión anterior.
+    """
+    existentes = indices_existentes(r)
+    version = r.incr(f"indice:version:{alias}")
+    while f"{alias}:v{version}" in existentes:
+        version = r.incr(f"indice:version:{alias}")
+    nuevo = f"{alias}:v{version}"
+
+    r.ft(nuevo).create_index(schema, definition=definition)
+    if not esperar_indexado(r, nuevo, timeout):
+        r.ft(nuevo).dropindex()
+        raise TimeoutError(f"El índice '{nuevo}' no terminó de indexar en {timeout}s")
+
+    anterior = indice_de_alias(r, alias)
+    if anterior == alias:
+        # Índice antiguo creado con el nombre del alias: hay que borrarlo para poder
+        # usar el nombre como alias (solo pasa la primera vez)
+        r.ft(alias).dropindex()
+    r.ft(nuevo).aliasupdate(alias)
+    if anterior and anterior != alias:
+        r.ft(anterior).dropindex()
+    return nuevo
@@ -1,24 +1,37 @@
-import redis
-import mysql.connector
 import os
 import json
 import time
-from datetime import datetime
 
 # --- IMPORTACIONES DE REDIS SEARCH ---
 from redis.commands.search.field import TextField, NumericField, TagField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
 from redis.commands.search.query import Query
-from redis.commands.search.aggregation import AggregateRequest, Desc
-# Importamos reducers para la agregación
-import redis.commands.search.reducers as reducers
+
+# Consulta/documento de SERVICIO compartidos con la sincronización incremental
+from sync_servicios import (SERVICIOS_QUERY, SERVICIOS_JSON_QUERY, documento_servicio, escribir_servicio_json,
+                            marcar_punto_partida)
+from migracion import migrar, resumen
+from indices import crear_indice_versionado
+import contadores
+import conexiones
 
 # --- CONFIGURACIÓN ---
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-DB_HOST = os.getenv("MYSQL_HOST", "localhost")
-DB_NAME = os.getenv("MYSQL_DB", "CENTROCUIDADOFAMILIAR")
-DB_USER = os.getenv("MYSQL_USER", "root")
-DB_PASS = os.getenv("MYSQL_PASSWORD")
+# Redis y MySQL: conexiones (pools) y sus variables de entorno en conexiones.py
+
+# SCAN: claves que Redis examina por llamada y tamaño de cada MGET
+SCAN_COUNT = int(os.getenv("REDIS_SCAN_COUNT", "1000"))
+MGET_BATCH = 200
+
+# Layout de las USUARIAS en clave-valor:
+#   "campos" -> una clave string por campo (centro:usuario:{id}:nombre, :apellido, :dni)
+#   "hash"   -> un hash por entidad (centro:usuario:{id}), que Redis guarda en formato
+#               compacto listpack mientras tenga pocos campos y valores cortos
+KV_LAYOUT = os.getenv("REDIS_KV_LAYOUT", "campos")
+KV_CAMPOS = ("nombre", "apellido", "dni")
+KV_BATCH = 500  # Comandos por pipeline.execute()
+
+# Cargas MySQL -> Redis con los campos calculados en el SELECT (1) o en Python (0)
+CARGA_EN_SQL = os.getenv("CARGA_EN_SQL", "1") == "1"
 
 # Helper de Logs
 def log(titulo, *args):
@@ -30,10 +43,76 @@ def log(titulo, *args):
     time.sleep(0.5)
 
 # Helper Conexión SQL
-def get_mysql_conn():
-    return mysql.connector.connect(
-        host=DB_HOST, user=DB_USER, password=DB_PASS, database=DB_NAME
-    )
+def get_mysql_connection():
+    # Conexión del pool compartido; conn.close() la devuelve al pool
+    return conexiones.get_mysql_connection()
+
+# Helpers de iteración por patrón (SCAN en lugar de KEYS)
+# KEYS recorre todo el keyspace de una vez y bloquea Redis mientras tanto;
+# SCAN avanza con un cursor en pasos de ~count claves y deja atender otras peticiones.
+def scan_claves(r, patron, count=SCAN_COUNT):
+    """ Itera (sin materializar) las claves que cumplen el patrón. """
+    return r.scan_iter(match=patron, count=count)
+
+def mget_por_lotes(r, claves, tam=MGET_BATCH):
+    """ Valores de muchas claves en un solo viaje: varios MGET dentro de un pipeline. """
+    pipe = r.pipeline(transaction=False)
+    for i in range(0, len(claves), tam):
+        pipe.mget(claves[i:i + tam])
+    return [valor for bloque in pipe.execute() for valor in bloque]
+
+def scan_lotes(r, patron, count=SCAN_COUNT, con_valores=True):
+    """
+    Modo de memoria acotada: genera (claves, valores) en bloques de como mucho count
+    claves, sin llegar a tener nunca la lista completa en memoria.
+    """
+    lote = []
+    for clave in scan_claves(r, patron, count):
+        lote.append(clave)
+        if len(lote) >= count:
+            yield lote, (mget_por_lotes(r, lote) if con_valores else None)
+            lote = []
+    if lote:
+        yield lote, (mget_por_lotes(r, lote) if con_valores else None)
+
+# Acceso a los campos de una usuaria según el layout en uso (ver KV_LAYOUT)
+def clave_campo(uid, campo, layout=KV_LAYOUT):
+    """ Clave donde vive el campo: centro:usuario:{id}:{campo} o el hash centro:usuario:{id}. """
+    return f"centro:usuario:{uid}" if layout == "hash" else f"centro:usuario:{uid}:{campo}"
+
+def leer_campo(r, uid, campo, layout=KV_LAYOUT):
+    if layout == "hash":
+        return r.hget(clave_campo(uid, campo, layout), campo)
+    return r.get(clave_campo(uid, campo, layout))
+
+def escribir_campo(r, uid, campo, valor, layout=KV_LAYOUT):
+    if layout == "hash":
+        return r.hset(clave_campo(uid, campo, layout), campo, valor)
+    return r.set(clave_campo(uid, campo, layout), valor)
+
+def borrar_campo(r, uid, campo, layout=KV_LAYOUT):
+    """ Borra el campo y devuelve si sigue existiendo. """
+    clave = clave_campo(uid, campo, layout)
+    if layout == "hash":
+        r.hdel(clave, campo)
+        return r.hexists(clave, campo)
+    r.delete(clave)
+    return r.exists(clave) == 1
+
+def patron_usuarios(ids, campo=None, layout=KV_LAYOUT):
+    """ Patrón de SCAN para los IDs dados (glob): un hash por usuaria o una clave por campo. """
+    if layout == "hash":
+        return f"centro:usuario:{ids}"
+    return f"centro:usuario:{ids}:{campo or '*'}"
+
+def valores_campo(r, claves, campo, layout=KV_LAYOUT):
+    """ Valor de 'campo' de cada clave de patron_usuarios(): MGET o HGET en pipeline. """
+    if layout != "hash":
+        return mget_por_lotes(r, claves)
+    pipe = r.pipeline(transaction=False)
+    for clave in claves:
+        pipe.hget(clave, campo)
+    return pipe.execute()
 
 # Limpieza Inicial
 def limpiar_db(r):
@@ -43,11 +122,11 @@ def limpiar_db(r):
 
 # --- EJERCICIOS 1-13: CLAVE-VALOR ---
 
-def req_1_crear_kv(r):
+def req_1_crear_kv(r, layout=KV_LAYOUT):
     log("1. CREAR REGISTROS CLAVE-VALOR (Desde MySQL)",
-        "Leyendo tabla USUARIA de MySQL y creando claves simples en Redis.")
+        f"Leyendo tabla USUARIA de MySQL y creando claves en Redis (layout '{layout}').")
     
-    conn = get_mysql_conn()
+    conn = get_mysql_connection()
     cursor = conn.cursor(dictionary=True)
     cursor.execute("SELECT IDUsuario, Nombre, Apellido, DNI FROM USUARIA LIMIT 10")
     usuarios = cursor.fetchall()
@@ -58,14 +137,82 @@ def req_1_crear_kv(r):
         return
 
     count = 0
+    pipe = r.pipeline(transaction=False)
     for u in usuarios:
         key_base = f"centro:usuario:{u['IDUsuario']}"
-        r.set(f"{key_base}:nombre", u['Nombre'])
-        r.set(f"{key_base}:apellido", u['Apellido'])
-        r.set(f"{key_base}:dni", u['DNI'])
+        valores = {"nombre": u['Nombre'], "apellido": u['Apellido'], "dni": u['DNI']}
+        if layout == "hash":
+            pipe.hset(key_base, mapping=valores)
+        else:
+            for campo, valor in valores.items():
+                pipe.set(f"{key_base}:{campo}", valor)
         count += 1
+        if count % KV_BATCH == 0:
+            pipe.execute()
+    pipe.execute()
     
-    log("1. RESULTADO", f"Se han migrado {count} usuarios de MySQL a claves Redis simples.")
+    log("1. RESULTADO", f"Se han migrado {count} usuarios de MySQL a Redis (layout '{layout}').")
+
+def migrar_claves_a_hash(r, conservar_origen=False):
+    """
+    Convierte las claves por campo (centro:usuario:{id}:{campo}) en un hash por
+    usuario (centro:usuario:{id}). Recorre el keyspace con SCAN y escribe en pipeline
+    por bloques; si conservar_origen es False, borra (UNLINK) las claves antiguas.
+    """
+    migradas = set()
+    for claves, valores in scan_lotes(r, "centro:usuario:*:*"):
+        pipe = r.pipeline(transaction=False)
+        for clave, valor in zip(claves, valores):
+            _, _, uid, campo = clave.split(":", 3)
+            if campo not in KV_CAMPOS or valor is None:
+                continue
+            pipe.hset(f"centro:usuario:{uid}", campo, valor)
+            if not conservar_origen:
+                pipe.unlink(clave)
+            migradas.add(uid)
+        pipe.execute()
+    return len(migradas)
+
+def informe_memoria_layouts(r, muestras=50):
+    """ Compara con MEMORY USAGE (sobre una muestra) los bytes por usuario de cada layout. """
+    ids = []
+    for clave in scan_claves(r, "centro:usuario:*:nombre"):
+        uid = clave.split(":")[2]
+        if r.exists(f"centro:usuario:{uid}"):
+            ids.append(uid)
+        if len(ids) >= muestras:
+            break
+    if not ids:
+        return None
+
+    pipe = r.pipeline(transaction=False)
+    for uid in ids:
+        for campo in KV_CAMPOS:
+            pipe.memory_usage(f"centro:usuario:{uid}:{campo}", samples=0)
+        pipe.memory_usage(f"centro:usuario:{uid}", samples=0)
+    resultados = pipe.execute()
+    por_usuario = len(KV_CAMPOS) + 1
+
+    bytes_campos = sum(v or 0 for i, v in enumerate(resultados) if i % por_usuario != por_usuario - 1)
+    bytes_hash = sum(v or 0 for v in resultados[por_usuario - 1::por_usuario])
+    return {
+        "usuarios_muestreados": len(ids),
+        "bytes_por_usuario_campos": round(bytes_campos / len(ids), 1),
+        "bytes_por_usuario_hash": round(bytes_hash / len(ids), 1),
+        "codificacion_hash": r.object("encoding", f"centro:usuario:{ids[0]}"),
+        "ahorro": f"{(1 - bytes_hash / bytes_campos) * 100:.1f}%" if bytes_campos else "n/a",
+    }
+
+def req_1b_layout_hash(r):
+    log("1B. LAYOUT HASH POR ENTIDAD",
+        "Migrando las claves por campo a un hash por usuario, comparando la memoria de ambos layouts",
+        "e indexando los hashes para filtrar en el servidor.")
+    migradas = migrar_claves_a_hash(r, conservar_origen=True)
+    informe = informe_memoria_layouts(r)
+    crear_indice_usuarios(r)
+    log("1B. RESULTADO", f"{migradas} usuarios migrados a 'centro:usuario:{{id}}'.",
+        f"Memoria (MEMORY USAGE): {json.dumps(informe, ensure_ascii=False)}",
+        f"Índice '{IDX_USUARIOS}' creado sobre los hashes (lo usan los pasos 11 y 12).")
 
 def req_2_contar_claves(r):
     log("2. OBTENER NÚMERO DE CLAVES", "Contando claves totales en Redis.")
@@ -74,120 +221,187 @@ def req_2_contar_claves(r):
 
 def req_3_obtener_clave(r):
     log("3. OBTENER REGISTRO POR CLAVE", "Obteniendo el nombre del Usuario ID 1.")
-    val = r.get("centro:usuario:1:nombre")
-    log("3. RESULTADO", f"Valor de 'centro:usuario:1:nombre': {val}")
+    val = leer_campo(r, 1, "nombre")
+    log("3. RESULTADO", f"Valor de 'nombre' en '{clave_campo(1, 'nombre')}': {val}")
 
 def req_4_actualizar_clave(r):
     log("4. ACTUALIZAR VALOR", "Corrigiendo el nombre del Usuario 1.")
-    antiguo = r.get("centro:usuario:1:nombre")
-    r.set("centro:usuario:1:nombre", f"{antiguo} (Editado)")
-    nuevo = r.get("centro:usuario:1:nombre")
+    antiguo = leer_campo(r, 1, "nombre")
+    if antiguo is None:
+        log("4. RESULTADO", f"El Usuario 1 no tiene nombre en '{clave_campo(1, 'nombre')}'; nada que editar.")
+        return
+    escribir_campo(r, 1, "nombre", f"{antiguo} (Editado)")
+    nuevo = leer_campo(r, 1, "nombre")
     log("4. RESULTADO", f"Antiguo: {antiguo} -> Nuevo: {nuevo}")
 
 def req_5_eliminar_clave(r):
     log("5. ELIMINAR CLAVE-VALOR", "Eliminando el DNI del Usuario 1.")
-    key = "centro:usuario:1:dni"
-    r.delete(key)
-    exists = r.exists(key)
-    log("5. RESULTADO", f"Clave '{key}' eliminada. ¿Existe?: {exists == 1}")
+    existe = borrar_campo(r, 1, "dni")
+    log("5. RESULTADO", f"'dni' eliminado de '{clave_campo(1, 'dni')}'. ¿Existe?: {existe}")
 
 def req_6_obtener_todas_las_claves(r):
     log("6. OBTENER TODAS LAS CLAVES", "Listando claves de usuarios.")
-    keys = r.keys("centro:usuario:*:nombre")
+    keys = list(scan_claves(r, patron_usuarios("*", "nombre")))
     log("6. RESULTADO", f"Encontradas {len(keys)} claves.", f"Ejemplo: {keys[:3]}")
 
 def req_7_obtener_todos_los_valores(r):
     log("7. OBTENER TODOS LOS VALORES", "Obteniendo nombres de usuarios.")
-    keys = r.keys("centro:usuario:*:nombre")
-    if keys:
-        valores = r.mget(keys)
-        log("7. RESULTADO", f"Nombres: {valores[:5]} ...")
+    muestra, total = [], 0
+    for claves, _ in scan_lotes(r, patron_usuarios("*", "nombre"), con_valores=False):
+        valores = valores_campo(r, claves, "nombre")
+        muestra.extend(valores[:5 - len(muestra)])
+        total += len(valores)
+    if total:
+        log("7. RESULTADO", f"{total} nombres. Primeros: {muestra} ...")
 
 def req_8_patron_asterisco(r):
     log("8. PATRÓN * (Asterisco)", "Todo sobre el Usuario 2.")
-    keys = r.keys("centro:usuario:2:*")
-    log("8. RESULTADO", f"Claves encontradas: {keys}")
+    keys = list(scan_claves(r, patron_usuarios(2)))
+    # Con el layout hash todo está en una sola clave: se listan sus campos
+    campos = [campo for clave in keys for campo in r.hkeys(clave)] if KV_LAYOUT == "hash" else None
+    log("8. RESULTADO", f"Claves encontradas: {keys}" + (f" (campos: {campos})" if campos is not None else ""))
 
 def req_9_patron_corchetes(r):
     log("9. PATRÓN [] (Rango)", "Usuarios ID 1 a 3.")
-    keys = r.keys("centro:usuario:[1-3]:nombre")
+    keys = list(scan_claves(r, patron_usuarios("[1-3]", "nombre")))
     log("9. RESULTADO", f"Claves encontradas: {keys}")
 
 def req_10_patron_interrogacion(r):
     log("10. PATRÓN ? (Interrogación)", "Usuarios con ID de un dígito.")
-    keys = r.keys("centro:usuario:?:nombre")
+    keys = list(scan_claves(r, patron_usuarios("?", "nombre")))
     log("10. RESULTADO", f"Encontrados: {len(keys)}")
 
+# --- FILTRADO Y ACTUALIZACIÓN EN EL SERVIDOR (hash + RediSearch + Lua) ---
+# El filtro lo resuelve el índice (coste proporcional a las coincidencias, no al keyspace)
+# y la actualización la hace un script Lua registrado: atómica y en una sola llamada por página.
+
+IDX_USUARIOS = "idx:usuarios"
+PAGINA_FILTRO = 1000
+
+# Usuarios cuyo nombre contiene "Ana" (como el antiguo `"Ana" in nombre`): la consulta infija
+# *Ana* trae los candidatos desde el índice (sin distinguir mayúsculas) y la comprobación
+# exacta, que sí las distingue, se hace sobre el campo devuelto
+FILTRO_ANA = "@nombre:*Ana*"
+CONTIENE_ANA = ("nombre", "Ana")
+
+# KEYS: N hashes a actualizar seguidos de sus N claves por campo ({hash}:{campo}, layout
+# 'campos') | ARGV[1]: campo | ARGV[2]: prefijo a añadir
+# Aplica el cambio a las dos copias que existan, para que los pasos 3-10 (que leen las claves
+# por campo) vean lo mismo que el índice. Devuelve cuántas usuarias se han actualizado
+# (no duplica el prefijo si ya lo tiene)
+LUA_PREFIJAR_CAMPO = """
+local campo, prefijo = ARGV[1], ARGV[2]
+local total = #KEYS / 2
+local n = 0
+local function prefijar(valor)
+    return valor and string.sub(valor, 1, #prefijo) ~= prefijo
+end
+for i = 1, total do
+    local hash, cadena = KEYS[i], KEYS[total + i]
+    local cambiado = false
+    local valor = redis.call('HGET', hash, campo)
+    if prefijar(valor) then
+        redis.call('HSET', hash, campo, prefijo .. valor)
+        cambiado = true
+    end
+    valor = redis.call('GET', cadena)
+    if prefijar(valor) then
+        redis.call('SET', cadena, prefijo .. valor, 'KEEPTTL')
+        cambiado = true
+    end
+    if cambiado then
+        n = n + 1
+    end
+end
+return n
+"""
+
+def crear_indice_usuarios(r):
+    """ Índice sobre los hashes centro:usuario:{id} (las claves string del layout 'campos' se ignoran). """
+    schema = (
+        TextField("nombre"),
+        TextField("apellido"),
+        TagField("dni"),
+    )
+    definition = IndexDefinition(prefix=["centro:usuario:"], index_type=IndexType.HASH)
+    return crear_indice_versionado(r, IDX_USUARIOS, schema, definition)
+
+def buscar_claves(r, consulta, indice=IDX_USUARIOS, pagina=PAGINA_FILTRO, contiene=None):
+    """
+    Claves que cumplen la consulta, página a página (NOCONTENT: solo viajan las claves).
+    Con contiene=(campo, texto) solo se devuelve ese campo y se exige que contenga 'texto'.
+    """
+    offset = 0
+    while True:
+        query = Query(consulta).paging(offset, pagina)
+        query = query.return_fields(contiene[0]) if contiene else query.no_content()
+        res = r.ft(indice).search(query)
+        claves = [doc.id for doc in res.docs
+                  if not contiene or contiene[1] in (getattr(doc, contiene[0], None) or "")]
+        if claves:
+            yield claves
+        offset += pagina
+        if offset >= res.total or not res.docs:
+            return
+
+def filtrar_y_actualizar(r, consulta, campo, prefijo, indice=IDX_USUARIOS, pagina=PAGINA_FILTRO, contiene=None):
+    """
+    Antepone prefijo a 'campo' en todos los hashes que cumplen la consulta (y en su clave
+    por campo, si existe). Devuelve los conteos.
+    """
+    prefijar = r.register_script(LUA_PREFIJAR_CAMPO)
+    coincidencias = actualizados = 0
+    for claves in buscar_claves(r, consulta, indice, pagina, contiene):
+        coincidencias += len(claves)
+        actualizados += prefijar(keys=claves + [f"{clave}:{campo}" for clave in claves], args=[campo, prefijo])
+    return {"coincidencias": coincidencias, "actualizados": actualizados}
+
 def req_11_filtrar_por_valor(r):
-    log("11. FILTRAR POR VALOR (Manual)", "Buscando usuarios con nombre 'Ana'.")
-    keys = r.keys("centro:usuario:*:nombre")
-    encontrados = []
-    if keys:
-        valores = r.mget(keys)
-        for i, nombre in enumerate(valores):
-            if nombre and "Ana" in nombre:
-                encontrados.append(keys[i])
+    log("11. FILTRAR POR VALOR (RediSearch)", "Buscando usuarios con nombre 'Ana' en el índice de hashes.")
+    encontrados = [clave for claves in buscar_claves(r, FILTRO_ANA, contiene=CONTIENE_ANA) for clave in claves]
     log("11. RESULTADO", f"Usuarios 'Ana': {encontrados}")
 
 def req_12_actualizar_por_filtro(r):
-    log("12. ACTUALIZAR POR FILTRO", "Añadiendo 'VIP' a usuarios 1 y 2.")
-    keys = r.keys("centro:usuario:[1-2]:apellido")
-    for k in keys:
-        antiguo = r.get(k)
-        r.set(k, f"VIP {antiguo}")
-    log("12. RESULTADO", "Apellidos actualizados.")
+    log("12. ACTUALIZAR POR FILTRO (Lua atómico)", "Añadiendo 'VIP' al apellido de los usuarios 'Ana'.")
+    conteos = filtrar_y_actualizar(r, FILTRO_ANA, "apellido", "VIP ", contiene=CONTIENE_ANA)
+    log("12. RESULTADO", f"{conteos['coincidencias']} coincidencias, {conteos['actualizados']} apellidos actualizados.")
 
 def req_13_eliminar_por_filtro(r):
     log("13. ELIMINAR POR FILTRO", "Borrando claves temporales.")
     r.set("temp:borrame", "1")
-    keys = r.keys("temp:*")
-    if keys:
-        r.delete(*keys)
-        log("13. RESULTADO", f"Eliminadas {len(keys)} claves.")
+    eliminadas = 0
+    for keys, _ in scan_lotes(r, "temp:*", con_valores=False):
+        # UNLINK libera la memoria en segundo plano, sin bloquear como DEL
+        eliminadas += r.unlink(*keys)
+    if eliminadas:
+        log("13. RESULTADO", f"Eliminadas {eliminadas} claves.")
 
 # --- EJERCICIOS 14-20: AVANZADOS ---
 
 def req_14_crear_json(r):
     log("14. CREAR JSON (Desde MySQL)", "Migrando tabla SERVICIO a Redis JSON.")
     
-    conn = get_mysql_conn()
-    cursor = conn.cursor(dictionary=True)
-    
-    query = """
-        SELECT 
-            s.IDServicio, s.FechaHoraInicio, s.FechaHoraFin, s.PrecioFinal, s.Estado,
-            u.Nombre as NomUsu, u.Apellido as ApeUsu,
-            c.Nombre as NomCui, c.Especialidad,
-            cen.NombreCentro
-        FROM SERVICIO s
-        LEFT JOIN USUARIA u ON s.IDUsuario = u.IDUsuario
-        LEFT JOIN CUIDADOR c ON s.IDCuidador = c.IDCuidador
-        LEFT JOIN CENTRO cen ON s.IDCentro = cen.IDCentro
-    """
-    cursor.execute(query)
-    servicios = cursor.fetchall()
+    conn = get_mysql_connection()
+    # Marca de agua antes de leer: sync_servicios.py continúa desde aquí de forma incremental
+    marca = marcar_punto_partida(r, conn)
+    # Recarga completa: los contadores por centro se rehacen junto con los documentos
+    contadores.reiniciar(r)
+
+    def escribir_fila(pipe, s):
+        doc = documento_servicio(s)
+        pipe.json().set(f"servicio:{s['IDServicio']}", "$", doc)
+        return 1 + contadores.sumar_documento(pipe, doc)
+
+    # Lectura por bloques con cursor sin buffer y pipeline vaciado cada FLUSH comandos
+    if CARGA_EN_SQL:
+        stats = migrar(conn, r, SERVICIOS_JSON_QUERY, escribir_servicio_json, dictionary=False)
+    else:
+        stats = migrar(conn, r, SERVICIOS_QUERY, escribir_fila)
     conn.close()
 
-    pipeline = r.pipeline()
-    for s in servicios:
-        duracion = 0
-        if s['FechaHoraInicio'] and s['FechaHoraFin']:
-            duracion = int((s['FechaHoraFin'] - s['FechaHoraInicio']).total_seconds() / 60)
-
-        doc = {
-            "id_servicio": s['IDServicio'],
-            "usuario": f"{s['NomUsu']} {s['ApeUsu']}",
-            "cuidador": s['NomCui'] or "Sin Asignar",
-            "especialidad": s['Especialidad'] or "General",
-            "centro": s['NombreCentro'] or "Domicilio",
-            "precio": float(s['PrecioFinal'] or 0),
-            "duracion_minutos": duracion,
-            "estado": s['Estado']
-        }
-        pipeline.json().set(f"servicio:{s['IDServicio']}", "$", doc)
-    
-    pipeline.execute()
-    log("14. RESULTADO", f"{len(servicios)} servicios cargados en Redis.")
+    log("14. RESULTADO", f"{stats['filas']} servicios cargados en Redis.", resumen(stats),
+        f"Marca de agua para 'sync_servicios.py': {marca}" if marca is not None
+        else "Sin SERVICIO_CAMBIOS (ejecuta db/setup_sql.py para la sincronización incremental).")
 
 def req_15_filtrar_json_atributos(r):
     log("15. FILTRAR JSON POR ATRIBUTO", "Obteniendo solo precio y usuario del servicio 1.")
@@ -216,15 +430,11 @@ def req_18_crear_indices(r):
         NumericField("$.duracion_minutos", as_name="duracion", sortable=True)
     )
     
-    try:
-        r.ft("idx:servicios").dropindex()
-    except:
-        pass
-
+    # Nueva versión del índice; el alias 'idx:servicios' solo cambia cuando está completa
     definition = IndexDefinition(prefix=["servicio:"], index_type=IndexType.JSON)
-    r.ft("idx:servicios").create_index(schema, definition=definition)
+    version = crear_indice_versionado(r, "idx:servicios", schema, definition)
     
-    log("18. RESULTADO", "Índice 'idx:servicios' creado.")
+    log("18. RESULTADO", f"Índice '{version}' creado, indexado y publicado como 'idx:servicios'.")
 
 def req_19_busqueda_indices(r):
     log("19. BÚSQUEDA CON ÍNDICES", "Servicios con precio < 80.")
@@ -233,70 +443,22 @@ def req_19_busqueda_indices(r):
     log("19. RESULTADO", f"Encontrados: {res.total}")
 
 def req_20_group_by_indices(r):
-    log("20. GROUP BY CON ÍNDICES", "Agrupando por Centro (Ingresos y Duración).")
-    
-    # --- CORRECCIÓN ---
-    # Usamos los ALIAS del índice (@precio, @duracion) no las rutas JSON ($.precio)
-    req = AggregateRequest("*").group_by(
-        ["@centro"], 
-        reducers.count().alias("conteo"), 
-        reducers.sum("@precio").alias("ingresos_totales"),  # @precio
-        reducers.avg("@duracion").alias("duracion_media")   # @duracion
-    ).sort_by(Desc("@conteo")) 
+    log("20. GROUP BY CON ÍNDICES", "Agrupando por Centro (Ingresos y Duración).",
+        "Panel leído de los contadores por centro que mantienen los cargadores (O(centros)).",
+        "La reconciliación con el índice (FT.AGGREGATE GROUPBY @centro) es aparte: contadores.py --reconciliar.")
 
     try:
-<<<<<<< HEAD
-        # --- CORRECCIÓN DE CÓDIGO (Nombre de clase) ---
-        # Petición de agregación
-        req = AggregateRequest("*").\
-                group_by("@categoria",  # Agrupar por categoría
-                         # Contar productos en el grupo
-                         "@count(0)", 
-                         # Calcular media de stock
-                         "@avg($.stock)", "AS", "stock_promedio" 
-                         ).\
-                sort_by("count", asc=False) # <-- CORRECCIÓN DE CÓDIGO (Sintaxis de 'sort_by')
-=======
-        res = r.ft("idx:servicios").aggregate(req)
->>>>>>> 3ae003fb9973f0e2c1e0f438013cbc531d662ff2
-        
-        resultados = []
-        for row in res.rows:
-            # El resultado viene como una lista de tuplas/bytes, lo parseamos
-            # Dependiendo de la versión de redis-py, row puede ser una lista o un dict
-            # En decode_responses=True, suelen ser strings o floats
-            
-            # Buscamos por nombre de campo en el resultado si es posible
-            centro = "Desconocido"
-            conteo = 0
-            ingresos = 0
-            duracion = 0
-            
-            # Método robusto: convertir la row a dict si es una lista plana
-            # o acceder por índice si sabemos el orden
-            # La estructura suele ser [campo, valor, campo, valor...] o un objeto.
-            # Con la librería moderna, suele permitir acceso directo.
-            
-            try:
-                # Intentamos acceso directo asumiendo que row es similar a un dict
-                centro = row[1] # El valor de @centro
-                conteo = row[3] # El valor de conteo
-                ingresos = float(row[5])
-                duracion = float(row[7])
-            except:
-                # Fallback si la estructura es distinta
-                pass
-
-            resultados.append(f"{centro}: {conteo} servicios, {ingresos:.2f}€, {duracion:.1f} min avg")
-
-        log("20. RESULTADO", f"Estadísticas:\n {json.dumps(resultados, indent=2)}")
+        resultados = [f"{f['centro']}: {f['servicios']} servicios, {f['ingresos']:.2f}€, {f['duracion_media']:.1f} min avg"
+                      for f in contadores.leer_panel(r)]
+
+        log("20. RESULTADO", f"Estadísticas:\n {json.dumps(resultados, indent=2, ensure_ascii=False)}")
     except Exception as e:
         log("20. ERROR", str(e))
 
 # --- EJECUCIÓN ---
 def main():
     try:
-        r = redis.Redis(host=REDIS_HOST, port=6379, decode_responses=True)
+        r = conexiones.get_redis()
         limpiar_db(r)
         
         req_1_crear_kv(r)
@@ -309,6 +471,7 @@ def main():
         req_8_patron_asterisco(r)
         req_9_patron_corchetes(r)
         req_10_patron_interrogacion(r)
+        req_1b_layout_hash(r)
         req_11_filtrar_por_valor(r)
         req_12_actualizar_por_filtro(r)
         req_13_eliminar_por_filtro(r)
@@ -318,7 +481,6 @@ def main():
         req_16_crear_lista(r)
         req_17_obtener_lista_filtro(r)
         req_18_crear_indices(r)
-        time.sleep(1) # Espera para indexado
         req_19_busqueda_indices(r)
         req_20_group_by_indices(r)
         
@@ -0,0 +1,130 @@
+import mysql.connector
+import os
+import queue
+import resource
+import threading
+import time
+
+# === MIGRACIÓN MySQL -> Redis POR BLOQUES (memoria acotada) ===
+# fetchall() + un único pipeline guardan a la vez el resultado completo y todos los comandos
+# pendientes. Aquí las filas llegan con un cursor sin buffer (fetchmany de LOTE en LOTE) y el
+# pipeline se vacía cada FLUSH comandos, así la memoria depende del lote y no de la tabla.
+# Con SOLAPAR, un hilo lector va trayendo el siguiente bloque mientras se escribe el actual
+# (como mucho EN_COLA bloques esperando).
+
+LOTE = int(os.getenv("MIGRACION_LOTE", "5000"))        # Filas por fetchmany
+FLUSH = int(os.getenv("MIGRACION_FLUSH", "1000"))      # Comandos por pipeline.execute()
+SOLAPAR = os.getenv("MIGRACION_SOLAPAR", "1") == "1"
+EN_COLA = 2
+
+_FIN = object()
+
+def rss_pico_mb():
+    """ Pico de memoria residente del proceso (ru_maxrss está en KB en Linux). """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def leer_bloques(conn, query, params=None, lote=LOTE, dictionary=True):
+    """ Genera bloques de filas con un cursor sin buffer: el servidor las envía según se piden. """
+    cursor = conn.cursor(dictionary=dictionary, buffered=False)
+    try:
+        cursor.execute(query, params or ())
+        while True:
+            filas = cursor.fetchmany(lote)
+            if not filas:
+                break
+            yield filas
+    finally:
+        # Si se abandona a medias, el resto del resultado debe leerse antes de reutilizar la
+        # conexión: si no, la siguiente consulta falla con "Unread result found"
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+def _leer_en_hilo(bloques):
+    """
+    Consume el generador en un hilo y entrega los bloques por una cola acotada.
+    Si quien lee deja de hacerlo (termina o falla), el hilo se detiene, cierra el generador
+    (y con él el cursor) y se espera a que acabe antes de seguir usando la conexión.
+    """
+    cola = queue.Queue(maxsize=EN_COLA)
+    parar = threading.Event()
+
+    def poner(item):
+        while not parar.is_set():
+            try:
+                cola.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def lector():
+        try:
+            for filas in bloques:
+                if not poner(filas):
+                    break
+        except Exception as e:
+            poner(e)
+        finally:
+            bloques.close()
+            poner(_FIN)
+
+    hilo = threading.Thread(target=lector, daemon=True)
+    hilo.start()
+    try:
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        parar.set()
+        hilo.join()
+
+def migrar(conn, r, query, escribir, params=None, lote=LOTE, flush=FLUSH, solapar=SOLAPAR, dictionary=True):
+    """
+    Lleva el resultado de 'query' a Redis. escribir(pipe, fila) encola los comandos de una fila
+    y puede devolver cuántos ha encolado (si no devuelve un entero cuenta como 1).
+    Devuelve {filas, comandos, segundos, filas_s, rss_pico_mb}.
+    """
+    inicio = time.perf_counter()
+    bloques = leer_bloques(conn, query, params, lote, dictionary)
+    if solapar:
+        bloques = _leer_en_hilo(bloques)
+
+    pipe = r.pipeline(transaction=False)
+    filas = comandos = pendientes = 0
+    try:
+        for bloque in bloques:
+            for fila in bloque:
+                n = escribir(pipe, fila)
+                n = n if isinstance(n, int) else 1
+                comandos += n
+                pendientes += n
+                filas += 1
+                if pendientes >= flush:
+                    pipe.execute()
+                    pendientes = 0
+        if pendientes:
+            pipe.execute()
+    finally:
+        # También si escribir() o Redis fallan: libera el hilo lector y el cursor
+        bloques.close()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "filas": filas,
+        "comandos": comandos,
+        "segundos": round(segundos, 2),
+        "filas_s": round(filas / segundos) if segundos > 0 else filas,
+        "rss_pico_mb": round(rss_pico_mb(), 1),
+    }
+
+def resumen(stats):
+    return (f"{stats['filas']} filas / {stats['comandos']} comandos en {stats['segundos']}s "
+            f"({stats['filas_s']} filas/s, pico RSS {stats['rss_pico_mb']} MB)")
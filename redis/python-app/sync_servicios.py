@@ -0,0 +1,319 @@
+import redis
+import mysql.connector
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import conexiones
+import contadores
+from migracion import migrar
+
+# === SINCRONIZACIÓN INCREMENTAL MySQL (SERVICIO) -> Redis JSON (servicio:{id}) ===
+# En lugar de releer todo el JOIN y reescribir todos los documentos en cada ejecución,
+# este proceso lee SERVICIO_CAMBIOS (alimentada por triggers, ver db/setup_sql.py) a partir
+# de la marca de agua guardada en Redis y solo toca los servicios que han cambiado.
+# Los servicios borrados en MySQL se eliminan de Redis y dejan una lápida tombstone:servicio:{id}.
+# Los contadores por centro (contadores.py) se ajustan con la diferencia entre el documento
+# anterior y el nuevo en la misma transacción.
+
+# --- CONFIGURACIÓN ---
+# Redis y MySQL: conexiones (pools) y sus variables de entorno en conexiones.py
+
+INTERVALO = float(os.getenv("SYNC_INTERVALO", "5"))       # Segundos entre sondeos sin cambios
+LOTE = int(os.getenv("SYNC_LOTE", "1000"))                 # Cambios leídos por iteración
+TTL_TOMBSTONE = int(os.getenv("SYNC_TTL_TOMBSTONE", str(7 * 24 * 3600)))
+# Los AUTO_INCREMENT se asignan antes del COMMIT: una transacción lenta puede confirmar un
+# IDCambio menor que otro ya leído. Los IDs que faltan por debajo de la marca de agua se
+# guardan como huecos y se vuelven a buscar en cada iteración hasta que aparecen o pasan
+# ESPERA_HUECOS segundos (entonces se dan por perdidos: transacción deshecha).
+ESPERA_HUECOS = float(os.getenv("SYNC_ESPERA_HUECOS", "300"))
+MAX_HUECOS = int(os.getenv("SYNC_MAX_HUECOS", "10000"))   # Solo se siguen los más recientes
+
+CLAVE_MARCA = "sync:servicio:ultimo_cambio"
+CLAVE_HUECOS = "sync:servicio:huecos"      # hash IDCambio -> instante en que se detectó
+# Los cargadores vacían SERVICIO con TRUNCATE, que no dispara los triggers de DELETE, y la
+# carga masiva silencia los de INSERT (@carga_masiva, ver db/setup_sql.py): dejan en
+# SERVICIO_CAMBIOS una fila con esta operación y la sincronización borra entonces todos los
+# servicio:{id} de Redis y los vuelve a cargar desde SERVICIO
+OPERACION_REINICIO = "R"
+
+# Consulta y documento compartidos con la carga completa (req_14 de main_app.py)
+SERVICIOS_JOIN = """
+    FROM SERVICIO s
+    LEFT JOIN USUARIA u ON s.IDUsuario = u.IDUsuario
+    LEFT JOIN CUIDADOR c ON s.IDCuidador = c.IDCuidador
+    LEFT JOIN CENTRO cen ON s.IDCentro = cen.IDCentro
+"""
+
+SERVICIOS_QUERY = """
+    SELECT
+        s.IDServicio, s.FechaHoraInicio, s.FechaHoraFin, s.PrecioFinal, s.Estado,
+        u.Nombre as NomUsu, u.Apellido as ApeUsu,
+        c.Nombre as NomCui, c.Especialidad,
+        cen.NombreCentro
+""" + SERVICIOS_JOIN
+
+# Variante de carga: MySQL calcula la duración (TIMESTAMPDIFF) y arma el documento con
+# JSON_OBJECT; cada fila llega como (clave, texto JSON, centro, precio, duracion) lista para
+# JSON.SET y los contadores por centro, sin datetimes ni diccionarios por fila en Python.
+# Mismo documento que documento_servicio().
+SERVICIOS_JSON_QUERY = """
+    SELECT
+        CONCAT('servicio:', s.IDServicio),
+        JSON_OBJECT(
+            'id_servicio', s.IDServicio,
+            'usuario', CONCAT_WS(' ', u.Nombre, u.Apellido),
+            'cuidador', COALESCE(c.Nombre, 'Sin Asignar'),
+            'especialidad', COALESCE(c.Especialidad, 'General'),
+            'centro', COALESCE(cen.NombreCentro, 'Domicilio'),
+            'precio', CAST(COALESCE(s.PrecioFinal, 0) AS DOUBLE),
+            'duracion_minutos', COALESCE(TIMESTAMPDIFF(MINUTE, s.FechaHoraInicio, s.FechaHoraFin), 0),
+            'estado', s.Estado
+        ),
+        COALESCE(cen.NombreCentro, 'Domicilio'),
+        COALESCE(s.PrecioFinal, 0),
+        COALESCE(TIMESTAMPDIFF(MINUTE, s.FechaHoraInicio, s.FechaHoraFin), 0)
+""" + SERVICIOS_JOIN
+
+CAMBIOS_QUERY = """
+    SELECT IDCambio, IDServicio, Operacion FROM SERVICIO_CAMBIOS
+    WHERE IDCambio > %s
+    ORDER BY IDCambio
+    LIMIT %s
+"""
+
+HUECOS_QUERY = "SELECT IDCambio, IDServicio, Operacion FROM SERVICIO_CAMBIOS WHERE IDCambio IN ({})"
+
+def log(titulo, msg):
+    print(f"[{datetime.now():%H:%M:%S}] [{titulo}] {msg}", flush=True)
+
+def get_mysql_connection():
+    conn = conexiones.get_mysql_connection()
+    # Sin autocommit, REPEATABLE READ congelaría la vista y el bucle no vería cambios nuevos
+    conn.autocommit = True
+    return conn
+
+def documento_servicio(s):
+    """ Fila del JOIN (cursor dictionary) -> documento JSON de servicio:{id}. """
+    duracion = 0
+    if s['FechaHoraInicio'] and s['FechaHoraFin']:
+        duracion = int((s['FechaHoraFin'] - s['FechaHoraInicio']).total_seconds() / 60)
+
+    return {
+        "id_servicio": s['IDServicio'],
+        "usuario": f"{s['NomUsu']} {s['ApeUsu']}",
+        "cuidador": s['NomCui'] or "Sin Asignar",
+        "especialidad": s['Especialidad'] or "General",
+        "centro": s['NombreCentro'] or "Domicilio",
+        "precio": float(s['PrecioFinal'] or 0),
+        "duracion_minutos": duracion,
+        "estado": s['Estado']
+    }
+
+def ultimo_cambio(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(IDCambio), 0) FROM SERVICIO_CAMBIOS")
+    return cursor.fetchall()[0][0]
+
+def marcar_punto_partida(r, conn):
+    """
+    Para la carga completa: guarda la marca de agua ANTES de leer el JOIN. Lo que cambie
+    durante la carga lo vuelve a aplicar la sincronización (los upserts son idempotentes).
+    """
+    try:
+        marca = ultimo_cambio(conn)
+    except mysql.connector.Error:
+        return None  # Sin SERVICIO_CAMBIOS (db/setup_sql.py no ejecutado): no hay sincronización
+    pipe = r.pipeline(transaction=True)
+    pipe.set(CLAVE_MARCA, marca)
+    pipe.delete(CLAVE_HUECOS)
+    pipe.execute()
+    return marca
+
+def leer_cambios(r, conn, lote):
+    """
+    Cambios posteriores a la marca de agua y huecos pendientes que ya son visibles.
+    Devuelve (cambios ordenados, nueva marca, huecos nuevos, huecos resueltos, huecos caducados).
+    """
+    marca = int(r.get(CLAVE_MARCA) or 0)
+    pendientes = {int(id_cambio): float(desde) for id_cambio, desde in r.hgetall(CLAVE_HUECOS).items()}
+
+    cursor = conn.cursor()
+    cursor.execute(CAMBIOS_QUERY, (marca, lote))
+    nuevos = cursor.fetchall()
+    recuperados = []
+    if pendientes:
+        cursor.execute(HUECOS_QUERY.format(", ".join(["%s"] * len(pendientes))), list(pendientes))
+        recuperados = cursor.fetchall()
+
+    nueva_marca = nuevos[-1][0] if nuevos else marca
+    vistos = {cambio[0] for cambio in nuevos}
+    huecos = [i for i in range(max(marca + 1, nueva_marca - MAX_HUECOS), nueva_marca) if i not in vistos]
+    resueltos = [cambio[0] for cambio in recuperados]
+    ahora = time.time()
+    caducados = [i for i, desde in pendientes.items()
+                 if i not in resueltos and ahora - desde > ESPERA_HUECOS]
+    return sorted(nuevos + recuperados), nueva_marca, huecos, resueltos, caducados
+
+def borrar_servicios(r, pagina=1000):
+    """ Reinicio: quita de Redis todos los servicio:{id} y los contadores por centro. """
+    borrados = 0
+    lote = []
+    for clave in r.scan_iter(match="servicio:*", count=pagina):
+        lote.append(clave)
+        if len(lote) >= pagina:
+            borrados += r.unlink(*lote)
+            lote = []
+    if lote:
+        borrados += r.unlink(*lote)
+    contadores.reiniciar(r)
+    return borrados
+
+def escribir_servicio_json(pipe, f):
+    """ Fila de SERVICIOS_JSON_QUERY (clave, json, centro, precio, duracion) -> JSON.SET y contadores. """
+    pipe.execute_command("JSON.SET", f[0], "$", f[1])
+    return 1 + contadores.sumar(pipe, f[2], f[3], f[4])
+
+def recargar_servicios(r, conn):
+    """ Reinicio: borra los servicio:{id} de Redis y los vuelve a cargar desde SERVICIO. Devuelve (borrados, cargados). """
+    borrados = borrar_servicios(r)
+    stats = migrar(conn, r, SERVICIOS_JSON_QUERY, escribir_servicio_json, dictionary=False)
+    return borrados, stats['filas']
+
+def sincronizar_lote(r, conn, lote=LOTE):
+    """
+    Aplica como mucho 'lote' cambios nuevos (más los huecos que hayan aparecido).
+    Devuelve (cambios_leidos, actualizados, borrados).
+    Se relee el estado ACTUAL de cada servicio afectado, así varios cambios de la misma
+    fila se resuelven con una sola escritura y da igual el orden en que llegaron.
+    """
+    cambios, nueva_marca, huecos, resueltos, caducados = leer_cambios(r, conn, lote)
+    if not cambios and not huecos and not caducados:
+        return 0, 0, 0
+    if caducados:
+        log("SYNC", f"{len(caducados)} IDCambio no aparecieron en {ESPERA_HUECOS:.0f}s; se descartan.")
+
+    # Tras una marca de reinicio se recarga SERVICIO entero y solo importan los cambios
+    # posteriores a ella (los anteriores ya están en la recarga)
+    reinicios = [i for i, cambio in enumerate(cambios) if cambio[2] == OPERACION_REINICIO]
+    if reinicios:
+        borrados, cargados = recargar_servicios(r, conn)
+        log("SYNC", f"Reinicio de SERVICIO en MySQL: {borrados} documentos eliminados de Redis "
+                    f"y {cargados} recargados.")
+        cambios = cambios[reinicios[-1] + 1:]
+
+    ids = sorted({id_servicio for _, id_servicio, _ in cambios})
+    vivos = {}
+    if ids:
+        cursor = conn.cursor(dictionary=True)
+        marcadores = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"{SERVICIOS_QUERY} WHERE s.IDServicio IN ({marcadores})", ids)
+        vivos = {s['IDServicio']: documento_servicio(s) for s in cursor.fetchall()}
+
+    # Escrituras, contadores y nueva marca de agua en una única transacción MULTI/EXEC.
+    # Los documentos actuales (para descontarlos de los contadores por centro) se leen con
+    # WATCH sobre sus claves: si otro proceso los cambia antes del EXEC se repite la lectura
+    claves = [f"servicio:{id_servicio}" for id_servicio in ids]
+    ahora = datetime.now().isoformat(timespec="seconds")
+    with r.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                if claves:
+                    pipe.watch(*claves)
+                anteriores = pipe.json().mget(claves, "$") if claves else []
+
+                pipe.multi()
+                for id_servicio, anterior in zip(ids, anteriores):
+                    if anterior:
+                        contadores.sumar_documento(pipe, anterior[0], signo=-1)
+                    if id_servicio in vivos:
+                        contadores.sumar_documento(pipe, vivos[id_servicio])
+                        pipe.json().set(f"servicio:{id_servicio}", "$", vivos[id_servicio])
+                        pipe.delete(f"tombstone:servicio:{id_servicio}")
+                    else:
+                        pipe.delete(f"servicio:{id_servicio}")
+                        pipe.set(f"tombstone:servicio:{id_servicio}",
+                                 json.dumps({"id_servicio": id_servicio, "eliminado": ahora}),
+                                 ex=TTL_TOMBSTONE)
+                pipe.set(CLAVE_MARCA, nueva_marca)
+                if resueltos or caducados:
+                    pipe.hdel(CLAVE_HUECOS, *(resueltos + caducados))
+                if huecos:
+                    detectado = time.time()
+                    pipe.hset(CLAVE_HUECOS, mapping={i: detectado for i in huecos})
+                pipe.execute()
+                break
+            except redis.WatchError:
+                # Alguien tocó un servicio:{id} entre la lectura y el EXEC: se vuelve a leer
+                continue
+
+    borrados = len(ids) - len(vivos)
+    return len(cambios), len(vivos), borrados
+
+def purgar_cambios(r, conn):
+    """ Borra de SERVICIO_CAMBIOS lo que ya está aplicado en Redis (sin llegar a los huecos pendientes). """
+    limite = int(r.get(CLAVE_MARCA) or 0)
+    huecos = [int(i) for i in r.hkeys(CLAVE_HUECOS)]
+    if huecos:
+        limite = min(limite, min(huecos) - 1)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM SERVICIO_CAMBIOS WHERE IDCambio <= %s", (limite,))
+    return cursor.rowcount
+
+def bucle(intervalo=INTERVALO, lote=LOTE, purgar=False, una_vez=False):
+    """ Proceso de larga duración: sondea, aplica lotes hasta ponerse al día y espera. """
+    r = conexiones.get_redis()
+    conn = None
+    log("SYNC", f"Sincronizando SERVICIO -> servicio:{{id}} cada {intervalo}s (lote {lote}).")
+    while True:
+        try:
+            if conn is None:
+                # Si la conexión se cae, la consulta falla, se devuelve al pool y se pide otra
+                conn = get_mysql_connection()
+            leidos, actualizados, borrados = sincronizar_lote(r, conn, lote)
+            if leidos:
+                log("SYNC", f"{leidos} cambios -> {actualizados} upserts, {borrados} tombstones "
+                            f"(marca {r.get(CLAVE_MARCA)}).")
+                if purgar:
+                    purgar_cambios(r, conn)
+            if una_vez and leidos < lote:
+                break
+            if leidos >= lote:
+                continue  # Hay atraso: siguiente lote sin esperar
+        except (mysql.connector.Error, redis.RedisError) as e:
+            log("ERROR", f"{e} (se reintenta en {intervalo}s)")
+            if conn is not None:
+                try:
+                    conn.close()
+                except mysql.connector.Error:
+                    pass
+            conn = None
+            if una_vez:
+                break
+        except KeyboardInterrupt:
+            break
+        try:
+            time.sleep(intervalo)
+        except KeyboardInterrupt:
+            break
+    if conn is not None and conn.is_connected():
+        conn.close()
+    r.close()
+    log("SYNC", "Sincronización detenida.")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sincronización incremental de SERVICIO (MySQL) a Redis JSON.")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO,
+                        help="Segundos de espera entre sondeos cuando no hay atraso.")
+    parser.add_argument("--lote", type=int, default=LOTE, help="Cambios leídos por iteración.")
+    parser.add_argument("--purgar", action="store_true",
+                        help="Borrar de SERVICIO_CAMBIOS las filas ya aplicadas.")
+    parser.add_argument("--una-vez", action="store_true",
+                        help="Ponerse al día y terminar (sin quedarse en bucle).")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    bucle(args.intervalo, args.lote, args.purgar, args.una_vez)
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+
+carga_masiva = pytest.importorskip("carga_masiva")
+
+# === Reparto por bloques de IDs y datos derivados del ID (sin MySQL) ===
+
+CTX = {
+    'seed': 42,
+    'ahora': datetime(2024, 6, 15),
+    'horas_max': 4,
+    'USUARIA': 23,
+    'DEPENDIENTE': 23,
+    'CUIDADOR': 7,
+    'CENTRO': 3,
+    'SERVICIO': 31,
+}
+
+@pytest.fixture(autouse=True)
+def bloques_pequenos(monkeypatch):
+    # Varios bloques (y uno incompleto al final) sin generar decenas de miles de filas
+    monkeypatch.setattr(carga_masiva, "TAM_BLOQUE", 5)
+
+def filas(tabla, num_shards):
+    resultado = []
+    for shard in range(num_shards):
+        resultado.extend(carga_masiva.generar_shard(tabla, shard, num_shards, CTX))
+    return sorted(resultado, key=lambda fila: fila[0])
+
+@pytest.mark.parametrize("tabla", carga_masiva.TABLAS_CARGA)
+def test_cada_id_se_genera_una_vez(tabla):
+    ids = [fila[0] for fila in filas(tabla, 3)]
+    assert ids == list(range(1, CTX[tabla] + 1))
+
+@pytest.mark.parametrize("tabla", carga_masiva.TABLAS_CARGA)
+def test_mismo_resultado_con_1_o_n_procesos(tabla):
+    assert filas(tabla, 1) == filas(tabla, 4)
+
+def test_la_semilla_cambia_los_datos():
+    otra = dict(CTX, seed=7)
+    original = filas('USUARIA', 1)
+    cambiada = sorted(carga_masiva.generar_shard('USUARIA', 0, 1, otra), key=lambda fila: fila[0])
+    assert original != cambiada
+
+def test_shards_sobrantes_no_generan_filas():
+    # Más procesos que bloques: los shards sin bloque terminan sin filas
+    assert list(carga_masiva.generar_shard('CENTRO', 1, 8, CTX)) == []
+
+def test_claves_foraneas_dentro_de_rango():
+    for fila in filas('SERVICIO', 2):
+        _, usuaria, dependiente, cuidador, centro, inicio, fin = fila[:7]
+        assert 1 <= usuaria <= CTX['USUARIA'] and dependiente == usuaria
+        assert 1 <= cuidador <= CTX['CUIDADOR']
+        assert 1 <= centro <= CTX['CENTRO']
+        assert inicio <= CTX['ahora'] and inicio < fin
+
+def test_dni_desde_id_valido():
+    dni = carga_masiva.dni_desde_id(1, carga_masiva.DNI_OFFSET_USUARIA)
+    numero = int(dni[:8])
+    assert dni == f"{numero:08d}{carga_masiva.LETRAS_DNI[numero % 23]}"
+    assert numero == carga_masiva.DNI_OFFSET_USUARIA + 1
+
+def test_dni_unicos_entre_tablas():
+    usuarias = {carga_masiva.dni_desde_id(i, carga_masiva.DNI_OFFSET_USUARIA) for i in range(1, 1001)}
+    cuidadores = {carga_masiva.dni_desde_id(i, carga_masiva.DNI_OFFSET_CUIDADOR) for i in range(1, 1001)}
+    assert len(usuarias) == len(cuidadores) == 1000
+    assert not usuarias & cuidadores
+
+def test_fecha_nacimiento_respeta_la_referencia():
+    from faker import Faker
+    fake = Faker('es_ES')
+    fake.seed_instance(1)
+    hoy = CTX['ahora'].date()
+    for _ in range(200):
+        nacimiento = carga_masiva.fecha_nacimiento(fake, CTX, 18, 90)
+        edad = hoy.year - nacimiento.year - ((hoy.month, hoy.day) < (nacimiento.month, nacimiento.day))
+        assert 18 <= edad <= 90, nacimiento
+
+def test_en_lotes():
+    assert list(carga_masiva.en_lotes(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(carga_masiva.en_lotes([], 3)) == []
@@ -0,0 +1,65 @@
+import pytest
+
+extended_app = pytest.importorskip("extended_app")
+from redis.commands.search.aggregation import AggregateRequest, Cursor
+
+# === Paginación de FT.AGGREGATE ... WITHCURSOR (cliente simulado, sin Redis Stack) ===
+
+class Resultado:
+    def __init__(self, rows, cid):
+        self.rows = rows
+        self.cursor = Cursor(cid) if cid is not None else None
+
+class RedisFalso:
+    """ Devuelve una página por llamada a aggregate y apunta los FT.CURSOR DEL. """
+
+    def __init__(self, paginas):
+        self.paginas = paginas
+        self.peticiones = []
+        self.comandos = []
+
+    def ft(self, indice):
+        return self
+
+    def aggregate(self, req):
+        self.peticiones.append(req)
+        indice = len(self.peticiones) - 1
+        ultima = indice == len(self.paginas) - 1
+        return Resultado(self.paginas[indice], 0 if ultima else 100 + indice)
+
+    def execute_command(self, *args):
+        self.comandos.append(args)
+
+def fila(id_servicio, duracion):
+    return ["id", str(id_servicio), "duracion", str(duracion)]
+
+def test_recorre_todas_las_paginas():
+    r = RedisFalso([[fila(1, 30), fila(2, 45)], [fila(3, 60)], [fila(4, 90)]])
+    paginas = list(extended_app.paginas_agregado(r, "idx", "*", ["@id", "@duracion"], pagina=2))
+    assert paginas == [
+        [{"id": "1", "duracion": "30"}, {"id": "2", "duracion": "45"}],
+        [{"id": "3", "duracion": "60"}],
+        [{"id": "4", "duracion": "90"}],
+    ]
+    # La primera petición es el AGGREGATE y las siguientes leen del cursor con el mismo COUNT
+    assert isinstance(r.peticiones[0], AggregateRequest)
+    assert [c.cid for c in r.peticiones[1:]] == [100, 101]
+    assert all(c.count == 2 for c in r.peticiones[1:])
+    assert r.comandos == []
+
+def test_paginas_vacias_no_se_entregan():
+    r = RedisFalso([[], [fila(1, 30)], []])
+    paginas = list(extended_app.paginas_agregado(r, "idx", "*", ["@id", "@duracion"], pagina=2))
+    assert paginas == [[{"id": "1", "duracion": "30"}]]
+
+def test_sin_cursor_termina():
+    r = RedisFalso([[fila(1, 30)]])
+    r.aggregate = lambda req: Resultado([fila(1, 30)], None)
+    assert len(list(extended_app.paginas_agregado(r, "idx", "*", ["@id"], pagina=2))) == 1
+
+def test_recorrido_a_medias_borra_el_cursor():
+    r = RedisFalso([[fila(1, 30)], [fila(2, 45)], [fila(3, 60)]])
+    paginas = extended_app.paginas_agregado(r, "idx", "*", ["@id", "@duracion"], pagina=1)
+    next(paginas)
+    paginas.close()
+    assert r.comandos == [("FT.CURSOR", "DEL", "idx", 100)]
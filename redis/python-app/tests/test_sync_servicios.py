@@ -0,0 +1,83 @@
+import pytest
+
+sync_servicios = pytest.importorskip("sync_servicios")
+fakeredis = pytest.importorskip("fakeredis")
+
+# === Marca de agua y huecos de SERVICIO_CAMBIOS (MySQL simulado + fakeredis) ===
+
+class CursorFalso:
+    def __init__(self, cambios):
+        self.cambios = cambios
+        self.filas = []
+
+    def execute(self, query, params):
+        if query == sync_servicios.CAMBIOS_QUERY:
+            marca, lote = params
+            self.filas = [c for c in self.cambios if c[0] > marca][:lote]
+        else:
+            self.filas = [c for c in self.cambios if c[0] in set(params)]
+
+    def fetchall(self):
+        return self.filas
+
+class ConexionFalsa:
+    """ SERVICIO_CAMBIOS confirmada hasta ahora: lista de (IDCambio, IDServicio, Operacion). """
+
+    def __init__(self, ids):
+        self.cambios = [(i, i, 'U') for i in ids]
+
+    def cursor(self):
+        return CursorFalso(sorted(self.cambios))
+
+@pytest.fixture
+def r():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+def test_sin_huecos(r):
+    cambios, marca, huecos, resueltos, caducados = sync_servicios.leer_cambios(r, ConexionFalsa([1, 2, 3]), 10)
+    assert [c[0] for c in cambios] == [1, 2, 3]
+    assert (marca, huecos, resueltos, caducados) == (3, [], [], [])
+
+def test_ids_saltados_se_guardan_como_huecos(r):
+    r.set(sync_servicios.CLAVE_MARCA, 2)
+    cambios, marca, huecos, _, _ = sync_servicios.leer_cambios(r, ConexionFalsa([1, 2, 4, 7]), 10)
+    assert [c[0] for c in cambios] == [4, 7]
+    assert marca == 7
+    assert huecos == [3, 5, 6]
+
+def test_lote_limita_la_marca(r):
+    _, marca, huecos, _, _ = sync_servicios.leer_cambios(r, ConexionFalsa([1, 3, 5, 7]), 2)
+    assert marca == 3
+    assert huecos == [2]
+
+def test_sin_cambios_no_mueve_la_marca(r):
+    r.set(sync_servicios.CLAVE_MARCA, 5)
+    cambios, marca, huecos, _, _ = sync_servicios.leer_cambios(r, ConexionFalsa([1, 2, 3, 4, 5]), 10)
+    assert (cambios, marca, huecos) == ([], 5, [])
+
+def test_hueco_que_aparece_se_resuelve(r, monkeypatch):
+    monkeypatch.setattr(sync_servicios.time, "time", lambda: 1000.0)
+    r.set(sync_servicios.CLAVE_MARCA, 7)
+    r.hset(sync_servicios.CLAVE_HUECOS, mapping={3: 990.0, 5: 990.0})
+    # La transacción que tenía el IDCambio 3 confirma tarde; la del 5 sigue abierta
+    cambios, marca, huecos, resueltos, caducados = sync_servicios.leer_cambios(r, ConexionFalsa([1, 2, 3, 4, 6, 7, 8]), 10)
+    assert [c[0] for c in cambios] == [3, 8]
+    assert (marca, huecos, resueltos, caducados) == (8, [], [3], [])
+
+def test_hueco_antiguo_caduca(r, monkeypatch):
+    ahora = 10_000.0
+    monkeypatch.setattr(sync_servicios.time, "time", lambda: ahora)
+    r.set(sync_servicios.CLAVE_MARCA, 4)
+    r.hset(sync_servicios.CLAVE_HUECOS, mapping={
+        2: ahora - sync_servicios.ESPERA_HUECOS - 1,   # Transacción deshecha: se da por perdido
+        3: ahora - 1,                                  # Aún dentro del plazo
+    })
+    _, _, _, resueltos, caducados = sync_servicios.leer_cambios(r, ConexionFalsa([1, 4]), 10)
+    assert resueltos == []
+    assert caducados == [2]
+
+def test_solo_se_siguen_los_huecos_recientes(r, monkeypatch):
+    monkeypatch.setattr(sync_servicios, "MAX_HUECOS", 3)
+    _, marca, huecos, _, _ = sync_servicios.leer_cambios(r, ConexionFalsa([1, 100]), 10)
+    assert marca == 100
+    assert huecos == [97, 98, 99]
@@ -0,0 +1,23 @@
+import redis
+
+# === VERSIONES DE LA CACHÉ DE CONSULTAS ===
+# cache_consultas.py (raíz del proyecto) incluye en cada clave la versión de las tablas que
+# lee: cache:version:{tabla}. Quien escribe en una tabla desde la app sube esa versión y los
+# resultados antiguos dejan de usarse (caducan solos por TTL).
+# Mismo formato de clave que CLAVE_VERSION en cache_consultas.py.
+
+CLAVE_VERSION = "cache:version:{tabla}"
+
+def invalidar(r, *tablas):
+    """ Sube la versión de las tablas escritas. Devuelve False si Redis no responde. """
+    if not tablas:
+        return False
+    try:
+        pipe = r.pipeline(transaction=False)
+        for tabla in tablas:
+            pipe.incr(CLAVE_VERSION.format(tabla=tabla))
+        pipe.execute()
+        return True
+    except redis.RedisError as err:
+        print(f" -> Aviso: no se pudo invalidar la caché de consultas ({err}).")
+        return False
@@ -1,8 +1,16 @@
 import mysql.connector
+import argparse
 import os
 import random
+import sys
 from faker import Faker
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+import cache_consultas
+
+# El motor de la carga masiva se comparte con el contenedor de Redis (db/servicios.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "redis", "python-app"))
+import carga_masiva
 
 # --- CONFIGURACIÓN ---
 # Usamos las variables de entorno del contenedor
@@ -13,14 +21,20 @@ DB_PASS = os.getenv("MYSQL_PASSWORD", "0853")
 
 NUM_BASE_RECORDS = 20 
 NUM_SERVICIOS = 50
+NUM_CENTROS = 5
+HORAS_MAX_SERVICIO = 8  # Duración máxima de un servicio generado
 fake = Faker('es_ES')
 
-def connect():
+# Tablas que vacía y rellena este script; al terminar se invalida su caché de consultas
+TABLAS_POBLADAS = ["RESENA", "TRANSACCION", "SERVICIO", "DEPENDIENTE", "CUIDADOR", "CENTRO", "USUARIA", "REGISTRO_TIEMPO"]
+
+def connect(**kwargs):
     return mysql.connector.connect(
         host=DB_HOST,
         user=DB_USER,
         password=DB_PASS,
-        database=DB_NAME
+        database=DB_NAME,
+        **kwargs
     )
 
 def main():
@@ -42,6 +56,7 @@ def main():
         cursor.execute("TRUNCATE TABLE USUARIA") 
         cursor.execute("TRUNCATE TABLE REGISTRO_TIEMPO") 
         cursor.execute("SET FOREIGN_KEY_CHECKS = 1;")
+        carga_masiva.marcar_reinicio_servicios(cursor)
 
         # --- 1. Insertar USUARIOS ---
         print(" -> Generando Usuarios...")
@@ -73,7 +88,7 @@ def main():
         # --- 4. Insertar CENTROS ---
         print(" -> Generando Centros...")
         centros_ids = []
-        for _ in range(5):
+        for _ in range(NUM_CENTROS):
             sql = "INSERT INTO CENTRO (NombreCentro, Direccion, DescripcionCentro, CapacidadMaxima) VALUES (%s, %s, %s, %s)"
             val = (fake.company(), fake.address(), fake.catch_phrase(), random.randint(10, 100))
             cursor.execute(sql, val)
@@ -105,6 +120,7 @@ def main():
             cursor.execute(sql, val)
 
         conn.commit()
+        cache_consultas.invalidar(*TABLAS_POBLADAS)
         print(f"✅ ¡ÉXITO! Se han insertado {NUM_SERVICIOS} servicios correctamente en MySQL.")
         print("Ahora puedes ejecutar 'extended_app.py' para procesarlos con Redis.")
 
@@ -113,5 +129,35 @@ def main():
     finally:
         if conn: conn.close()
 
+
+# ----------------------------------------------------------------------
+# MODO CARGA MASIVA (--bulk): el motor está en redis/python-app/carga_masiva.py
+# ----------------------------------------------------------------------
+
+def main_bulk(args):
+    print(f"--- Carga masiva en {DB_HOST} (lote={args.batch_size}, workers={args.workers}, "
+          f"{'LOAD DATA' if args.load_data else 'executemany'}) ---")
+    conn = None
+    try:
+        conn = connect(allow_local_infile=args.load_data)
+        total, segundos = carga_masiva.cargar_todo(conn, args, TABLAS_POBLADAS, HORAS_MAX_SERVICIO)
+        cache_consultas.invalidar(*TABLAS_POBLADAS)
+        print(f"✅ ¡ÉXITO! {total} filas en {segundos:.1f}s ({total / segundos:,.0f} filas/s en total).")
+
+    except mysql.connector.Error as err:
+        print(f"❌ Error MySQL: {err}")
+    finally:
+        if conn: conn.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rellena CENTROCUIDADOFAMILIAR con datos de Faker.")
+    carga_masiva.añadir_argumentos(parser, usuarias=NUM_BASE_RECORDS, cuidadores=NUM_BASE_RECORDS,
+                                   centros=NUM_CENTROS, servicios=NUM_SERVICIOS)
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.bulk:
+        main_bulk(args)
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los scripts de la raíz se importan como módulos sueltos (no hay paquete)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+import pytest
+
+crp = pytest.importorskip("consultaRentaPercapita")
+
+# === Bandas de renta y rango SQL (sin bases de datos) ===
+
+def test_covering_range_une_las_bandas():
+    bands = [crp.threshold_band(15000.00), crp.range_band(10000.00, 20000.00)]
+    assert crp.covering_range(bands) == (10000.00, None)
+
+def test_covering_range_sin_limites():
+    bands = [crp.range_band(None, 20000.00), crp.range_band(5000.00, 30000.00)]
+    assert crp.covering_range(bands) == (None, 30000.00)
+
+def test_covering_range_una_banda():
+    assert crp.covering_range([crp.range_band(1000.00, 2000.00)]) == (1000.00, 2000.00)
+
+def test_sql_range_con_los_dos_limites():
+    query, params = crp._sql_range(15000.00, 30000.00)
+    assert query.startswith(crp.USUARIA_QUERY)
+    assert query.endswith("WHERE RentaPercapita > %s AND RentaPercapita <= %s")
+    assert params == (15000.00, 30000.00)
+
+def test_sql_range_solo_minimo():
+    query, params = crp._sql_range(15000.00, None)
+    assert query.endswith("WHERE RentaPercapita > %s")
+    assert params == (15000.00,)
+
+def test_sql_range_sin_limites():
+    query, params = crp._sql_range(None, None)
+    assert query == crp.USUARIA_QUERY
+    assert params == ()
+
+def test_sql_range_no_interpola_valores():
+    query, _ = crp._sql_range(12345.67, 76543.21)
+    assert "12345" not in query and "76543" not in query
+
+@pytest.mark.parametrize("renta, esperado", [
+    (None, False),
+    (15000.00, False),   # El mínimo es exclusivo
+    (15000.01, True),
+    (30000.00, True),    # El máximo es inclusivo
+    (30000.01, False),
+])
+def test_in_band_limites(renta, esperado):
+    assert crp.in_band(crp.range_band(15000.00, 30000.00), renta) is esperado
+
+def test_el_rango_cubre_a_todas_las_bandas():
+    # Lo que devuelve la única consulta por fuente contiene las filas de cada banda
+    bands = [crp.threshold_band(30000.00), crp.range_band(15000.00, 20000.00)]
+    lower, upper = crp.covering_range(bands)
+    cubierta = {'min': lower, 'max': upper}
+    for renta in (15000.00, 15000.01, 19999.99, 20000.00, 25000.00, 30000.01, 99999.00):
+        if any(crp.in_band(b, renta) for b in bands):
+            assert crp.in_band(cubierta, renta)